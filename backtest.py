@@ -0,0 +1,95 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import history_store
+from signals import market_status_index, low_band_index, MARKET_STATUS_LABELS, LOW_BAND_LABELS
+
+# --- 設定區 ---
+WINDOW = 200               # 與 stock_db.csv 相同：近 200 日高低點
+MA_DAYS = 5
+HORIZONS = [1, 5, 10, 20]  # 訊號出現後 N 個交易日的報酬
+REPORT_FILE = 'backtest_report.csv'
+# 分類規則 -> (整數版分類函式, 編號對應的訊號名稱)
+RULES = {'market_status': (market_status_index, MARKET_STATUS_LABELS),
+         'low_band': (low_band_index, LOW_BAND_LABELS)}
+
+def load_panel(codes=None, end=None):
+    """把本地歷史資料庫組成 [日期 x 代號] 的收盤價表 (停牌日沿用前一天收盤，上市前與下市後為 NaN)"""
+    codes = history_store.list_codes() if codes is None else codes
+    series = {}
+    for code in codes:
+        bars = history_store.load_history(code)
+        if bars is not None and len(bars) > 0:
+            series[code] = pd.Series(np.asarray(bars['close']), index=pd.DatetimeIndex(np.asarray(bars['date'])))
+    raw = pd.DataFrame(series).sort_index()
+    closes = raw.ffill().where(raw.bfill().notna())
+    if end is not None:
+        closes = closes.loc[:pd.Timestamp(end)]
+    return closes
+
+def reference_panel(closes):
+    """每天掃描時的參考值：高低點與 data_builder 前一天建好的 stock_db.csv 相同 (只用到昨天為止的資料)，
+    MA5 與掃描時的盤中即時均線相同 (前 4 天收盤 + 當天價格)"""
+    low = closes.rolling(WINDOW).min().shift(1)
+    high = closes.rolling(WINDOW).max().shift(1)
+    ma5 = closes.rolling(MA_DAYS).mean()
+    return low, high, ma5
+
+def run_backtest(closes, horizons=HORIZONS, rule='market_status', start=None):
+    """用當天收盤價當作掃描時的現價，整個 [日期 x 代號] 表一次分類，
+    回傳每個訊號類別的 N 日後報酬統計 (次數、平均、中位數、勝率)
+    start 之前的資料只用來算指標 (不統計)"""
+    classify, labels = RULES[rule]
+    low, high, ma5 = reference_panel(closes)
+    valid = low.notna().to_numpy() & closes.notna().to_numpy()
+    if start is not None:
+        valid &= (closes.index >= pd.Timestamp(start))[:, None]
+
+    price = closes.to_numpy()[valid]
+    index = classify(price, low.to_numpy()[valid], high.to_numpy()[valid], ma5.to_numpy()[valid])[0]
+    names = np.where(labels == "", "(無訊號)", labels)
+    status = pd.Categorical.from_codes(index, categories=names)
+
+    stats = []
+    for n in horizons:
+        forward = (closes.shift(-n) / closes - 1).to_numpy()[valid] * 100
+        df = pd.DataFrame({'status': status, 'ret': forward}).dropna()
+        for name, ret in [('全部', df['ret'])] + list(df.groupby('status', observed=True)['ret']):
+            stats.append({
+                '訊號': name,
+                '天數': n,
+                '次數': len(ret),
+                '平均報酬(%)': round(ret.mean(), 2),
+                '中位數(%)': round(ret.median(), 2),
+                '勝率(%)': round((ret > 0).mean() * 100, 1),
+            })
+    return pd.DataFrame(stats)
+
+def print_summary(result):
+    for n, table in result.groupby('天數'):
+        print(f"\n📈 訊號出現後 {n} 個交易日")
+        print(table.drop(columns='天數').sort_values('平均報酬(%)', ascending=False).to_string(index=False))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="訊號分類回測：用本地歷史資料庫逐日重播分類規則，統計各類訊號之後的報酬")
+    parser.add_argument('--rule', choices=sorted(RULES), default='market_status', help="分類規則")
+    parser.add_argument('--horizons', type=int, nargs='+', default=HORIZONS, help="統計幾個交易日後的報酬")
+    parser.add_argument('--start', help="回測起日 (YYYY-MM-DD，之前的資料只用來算指標)")
+    parser.add_argument('--end', help="回測迄日 (YYYY-MM-DD)")
+    parser.add_argument('--out', default=REPORT_FILE, help="結果 CSV")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    closes = load_panel(end=args.end)
+    if closes.empty:
+        raise SystemExit("❌ 本地歷史資料庫是空的！請先執行 data_builder.py (回測多年請把 HISTORY_DAYS 調大後加 --full)")
+    loaded = time.perf_counter()
+    result = run_backtest(closes, args.horizons, args.rule, args.start)
+    finished = time.perf_counter()
+
+    print(f"📚 {closes.shape[1]} 檔 x {closes.shape[0]} 個交易日 ({closes.index[0].date()} ~ {closes.index[-1].date()})，"
+          f"讀取 {loaded - started:.2f}s、回測 {finished - loaded:.2f}s")
+    print_summary(result)
+    result.to_csv(args.out, index=False, encoding='utf-8-sig')
+    print(f"\n✅ 結果已儲存為: {args.out}")
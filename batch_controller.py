@@ -0,0 +1,77 @@
+import os
+import json
+import random
+
+# --- 設定區 ---
+STATE_FILE = 'batch_state.json'  # 記住上次最好的批次大小/間隔，下次從這裡開始 (每個程式各一份，見 state_path)
+MIN_BATCH = 5
+MAX_BATCH = 50
+MIN_DELAY = 0.5   # 批次間最短休息秒數
+MAX_DELAY = 8.0
+GROW_EVERY = 5    # 連續成功幾批後加速一次
+
+def state_path(name=None):
+    """每個掃描程式各自的存檔 (batch_state_sniper_fast.json...)，批次設定不同的程式才不會互相覆蓋"""
+    if not name:
+        return STATE_FILE
+    base, ext = os.path.splitext(STATE_FILE)
+    return f"{base}_{name}{ext}"
+
+class AdaptiveBatchController:
+    """自動調整 twstock.realtime.get 的批次大小與間隔：
+    - 連續成功：批次加大、間隔縮短
+    - 回傳 None / 連線錯誤：批次減半、間隔加倍
+    最後一次穩定的設定會存到 STATE_FILE，下次掃描直接從那裡開始"""
+
+    def __init__(self, batch_size=8, delay=2.0, state_file=STATE_FILE):
+        self.state_file = state_file
+        self.batch_size = batch_size
+        self.delay = delay
+        self.good = (batch_size, delay) # 最後一次穩定的設定
+        self.streak = 0
+        self.failures = 0
+
+    @classmethod
+    def load(cls, batch_size=8, delay=2.0, state_file=STATE_FILE):
+        """有存檔就從上次的設定開始，沒有就用呼叫端給的預設值"""
+        ctrl = cls(batch_size, delay, state_file)
+        if state_file and os.path.exists(state_file):
+            try:
+                with open(state_file, encoding='utf-8') as f:
+                    state = json.load(f)
+                ctrl.batch_size = _clamp(int(state['batch_size']), MIN_BATCH, MAX_BATCH)
+                ctrl.delay = _clamp(float(state['delay']), MIN_DELAY, MAX_DELAY)
+                ctrl.good = (ctrl.batch_size, ctrl.delay)
+            except (ValueError, KeyError, TypeError):
+                pass # 存檔壞掉就用預設值
+        return ctrl
+
+    def next_delay(self):
+        """這一批之後要休息多久 (加一點隨機避免太規律)"""
+        return random.uniform(self.delay, self.delay * 1.5)
+
+    def on_success(self):
+        self.streak += 1
+        self.good = (self.batch_size, self.delay)
+        if self.streak >= GROW_EVERY:
+            self.streak = 0
+            self.batch_size = min(MAX_BATCH, self.batch_size + max(1, self.batch_size // 4))
+            self.delay = max(MIN_DELAY, self.delay * 0.8)
+
+    def on_failure(self):
+        self.streak = 0
+        self.failures += 1
+        # 退回上次穩定的設定再減半，避免在臨界點附近反覆被擋
+        self.batch_size = max(MIN_BATCH, min(self.batch_size, self.good[0]) // 2)
+        self.delay = min(MAX_DELAY, max(self.delay, self.good[1]) * 2)
+        self.good = (self.batch_size, self.delay)
+
+    def save(self):
+        if not self.state_file:
+            return
+        batch_size, delay = self.good
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump({'batch_size': batch_size, 'delay': round(delay, 3)}, f)
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
@@ -0,0 +1,336 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import datetime
+import platform
+import tempfile
+import importlib
+import subprocess
+import contextlib
+import numpy as np
+import pandas as pd
+import history_store
+import data_builder
+import indicators
+import realtime_pipeline
+import scan_engine
+import metrics
+import fake_servers
+import reference_table
+from reference_table import ReferenceTable
+from batch_controller import AdaptiveBatchController
+from scan_engine import fetch_snapshot
+from signals import classify_quotes, classify_market_status
+from strategies import LowBandStrategy, MarketStatusStrategy
+from news_pool import NewsWorkerPool
+from news_scanner import score_titles
+
+# --- 設定區 ---
+SIZES = [1000, 10000, 100000]  # 合成市場的股票檔數
+REPEAT = 3                     # 每個階段跑幾次 (總時間取最快的一次，延遲分位數用全部樣本)
+BATCH_SIZE = 20                # 模擬報價查詢的批次大小
+BUILD_SAMPLE = 1000            # build 階段最多寫幾檔歷史 (10 萬檔 .npy 太佔空間)
+NEWS_SAMPLE = 500              # news 階段最多查幾檔
+RESULTS_DIR = 'bench_results'
+SEED = 42
+
+# 合成新聞標題 (涵蓋正面、負面、否定詞)
+SAMPLE_TITLES = ['營收創高 法人買超', '第三季虧損擴大', '未見成長 股價疲弱', '旺季效應 獲利大增', '董事會決議配息']
+
+def make_universe(n, seed=SEED):
+    """合成 n 檔股票的 stock_db.csv 內容與一份對應的即時報價 {代號: 現價}
+    價格分布涵蓋所有訊號類型 (低檔、翻揚、盤整、創高、突破)"""
+    rng = np.random.default_rng(seed)
+    codes = np.array([str(900000 + i) for i in range(n)])
+    low = rng.uniform(10, 500, n).round(2)
+    high = (low * rng.uniform(1.2, 2.5, n)).round(2)
+    ma5 = (low + (high - low) * rng.uniform(0, 1, n)).round(2)
+    ma20 = (low + (high - low) * rng.uniform(0, 1, n)).round(2)
+    df = pd.DataFrame({
+        'code': codes,
+        'name': [f"合成{c}" for c in codes],
+        'low_200': low,
+        'high_200': high,
+        'ma5_ref': ma5,
+        'ma20_ref': ma20,
+        'last_update': str(datetime.date.today()),
+    })
+    prices = (low * rng.uniform(0.95, 1.05, n) * np.where(rng.random(n) < 0.5, 1, high / low)).round(2)
+    return df, dict(zip(codes.tolist(), prices.tolist()))
+
+def make_closes(df, seed=SEED):
+    """合成 stock_db_closes.npz 的最近收盤價 (由 ma20_ref 走到 ma5_ref 附近)，讓分類時算得到盤中即時均線"""
+    rng = np.random.default_rng(seed)
+    path = np.linspace(df['ma20_ref'], df['ma5_ref'], reference_table.TRAILING_DAYS).T
+    return (path * rng.uniform(0.99, 1.01, path.shape)).round(2)
+
+def make_bars(rng, days=300):
+    """合成一檔的日 K (隨機漫步)"""
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    bars = np.zeros(days, dtype=history_store.BAR_DTYPE)
+    bars['date'] = np.datetime64(datetime.date.today(), 'D') - np.arange(days)[::-1]
+    bars['open'] = close * rng.uniform(0.98, 1.02, days)
+    bars['high'] = np.maximum(bars['open'], close) * 1.01
+    bars['low'] = np.minimum(bars['open'], close) * 0.99
+    bars['close'] = close
+    bars['volume'] = rng.integers(1000, 100000, days)
+    return bars
+
+def realtime_payload(quotes, names):
+    """{代號: 現價} -> twstock.realtime.get(list) 格式的 quote_fn"""
+    payloads = {c: {'success': True, 'info': {'code': c, 'name': names[c]},
+                    'realtime': {'latest_trade_price': f"{p:.2f}"}} for c, p in quotes.items()}
+
+    def quote_fn(batch):
+        data = {'success': True}
+        data.update((c, payloads[c]) for c in batch if c in payloads)
+        return data
+    return quote_fn
+
+def msg_array(quotes, names):
+    """{代號: 現價} -> 證交所 msgArray 原始項目 (給 fake_servers 重播，twstock.realtime 也解析得了)"""
+    return {c: {'c': c, 'n': names[c], 'nf': names[c], 'ch': f"{c}.tw", 'tlong': '1700000000000',
+                'z': f"{p:.2f}", 'o': '-', 'h': '-', 'l': '-', 'v': '0'}
+            for c, p in quotes.items()}
+
+def git_commit():
+    """目前的 commit (有未提交的修改時加上 -dirty)，讓不同版本的結果可以互相比較"""
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+        dirty = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], text=True).strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+class StageTimer:
+    """記錄一個階段每次執行的總時間，以及每個單位 (批次/檔) 的延遲樣本"""
+
+    def __init__(self, items):
+        self.items = items
+        self.totals = []
+        self.samples = []
+
+    @contextlib.contextmanager
+    def run(self):
+        start = time.perf_counter()
+        yield self.samples
+        self.totals.append(time.perf_counter() - start)
+
+    def summary(self):
+        best = min(self.totals)
+        samples = np.asarray(self.samples or self.totals) * 1000
+        return {
+            'items': self.items,
+            'seconds': round(best, 4),
+            'throughput': round(self.items / best, 1) if best > 0 else None,
+            'p50_ms': round(float(np.percentile(samples, 50)), 4),
+            'p95_ms': round(float(np.percentile(samples, 95)), 4),
+            'runs': len(self.totals),
+        }
+
+@contextlib.contextmanager
+def quiet():
+    """掃描程式會印很多進度與表格，計時時丟掉 (格式化字串的成本仍然算在內)"""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def timed_batches(samples, fn):
+    """包一層 fn，每次呼叫的耗時記進 samples"""
+    def wrapper(*args):
+        start = time.perf_counter()
+        result = fn(*args)
+        samples.append(time.perf_counter() - start)
+        return result
+    return wrapper
+
+@contextlib.contextmanager
+def planned_sleeps():
+    """掃描程式的批次間隔 / 退避不真的睡，只把秒數記下來 (加回總時間，估算實際掃完要多久)"""
+    planned = []
+    original = metrics.sleep
+    metrics.sleep = lambda seconds, reason: planned.append(seconds)
+    try:
+        yield planned
+    finally:
+        metrics.sleep = original
+
+def scanner_engine(scanner, ref, quote_fn=None):
+    """照 sniper_*.py 的設定建立 ScanEngine (不用報價快取、不讀寫批次存檔，每次從同樣的起點開始)"""
+    use_cache, scan_engine.USE_QUOTE_CACHE = scan_engine.USE_QUOTE_CACHE, False
+    try:
+        engine = importlib.import_module(scanner).make_engine(ref)
+    finally:
+        scan_engine.USE_QUOTE_CACHE = use_cache
+    engine.quote_fn = quote_fn or engine.quote_fn
+    if engine.controller:
+        engine.controller = AdaptiveBatchController(engine.batch_size, sum(engine.sleep_range) / 2, state_file=None)
+    return engine
+
+def bench_universe(n, workdir, repeat=REPEAT, batch_size=BATCH_SIZE, http=False, scanner=None):
+    df, quotes = make_universe(n)
+    names = dict(zip(df['code'], df['name']))
+    codes = df['code'].tolist()
+    csv_path = os.path.join(workdir, f'stock_db_{n}.csv')
+    df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+    reference_table.save_closes(codes, make_closes(df), csv_path)
+    stages = {}
+
+    # build：寫入歷史 -> 讀回 -> 算出參考資料 -> 匯出 stock_db.csv (data_builder 離線部分)
+    sample = codes[:BUILD_SAMPLE]
+    rng = np.random.default_rng(SEED)
+    history_store.HISTORY_DIR = os.path.join(workdir, f'history_{n}')
+    data_builder.CSV_FILE = os.path.join(workdir, f'built_{n}.csv')
+    indicators.STATE_FILE = os.path.join(workdir, f'indicators_{n}.json')
+    bars = {c: make_bars(rng) for c in sample}
+    t = stages['build'] = StageTimer(len(sample))
+    for _ in range(repeat):
+        with t.run() as samples:
+            for c in sample:
+                timed_batches(samples, history_store.save_history)(c, bars[c])
+            if os.path.exists(indicators.STATE_FILE):
+                os.remove(indicators.STATE_FILE) # 每次都從頭算，結果才能跨版本比較
+            data_builder.export_reference_db(sample)
+
+    t = stages['load'] = StageTimer(n)
+    for _ in range(repeat):
+        with t.run():
+            ref = ReferenceTable.from_csv(csv_path)
+
+    t = stages['fetch'] = StageTimer(n)
+    if scanner:
+        # 照掃描程式的批次大小與休息時間抓一輪，總時間 = 實際耗時 + 規劃的休息秒數
+        server = fake_servers.quote_server(msg_array(quotes, names)).start() if http else None
+        try:
+            if server:
+                fake_servers.use_fake_servers(quote_url=server.url)
+            for _ in range(repeat):
+                random.seed(SEED)
+                engine = scanner_engine(scanner, ref, None if http else realtime_payload(quotes, names))
+                with planned_sleeps() as planned, quiet():
+                    with t.run():
+                        snapshot = engine.fetch(codes)
+                t.totals[-1] += sum(planned)
+        finally:
+            if server:
+                server.stop()
+    elif http:
+        # 走完整的 HTTP 堆疊：本機假伺服器 + realtime_pipeline 併發抓取
+        with fake_servers.quote_server(msg_array(quotes, names)) as server, quiet():
+            realtime_pipeline.use_quote_server(server.url)
+            for _ in range(repeat):
+                with t.run() as samples:
+                    snapshot = realtime_pipeline.fetch_snapshot_concurrent(
+                        codes, batch_size=batch_size, max_rps=1e6,
+                        quote_fn=timed_batches(samples, realtime_pipeline.get_quotes))
+    else:
+        quote_fn = realtime_payload(quotes, names)
+        for _ in range(repeat):
+            with t.run() as samples, quiet():
+                snapshot = fetch_snapshot(codes, batch_size, (0, 0), timed_batches(samples, quote_fn))
+    assert len(snapshot) == n, f"快照只有 {len(snapshot)}/{n} 檔"
+
+    batches = [codes[i : i + batch_size] for i in range(0, n, batch_size)]
+    t = stages['lookup'] = StageTimer(n)
+    for _ in range(repeat):
+        with t.run() as samples:
+            rows = timed_batches(samples, ref.rows)
+            for batch in batches:
+                rows(batch)
+
+    t = stages['classify'] = StageTimer(n)
+    batch_quotes = [{c: snapshot.quotes[c] for c in batch} for batch in batches]
+    for _ in range(repeat):
+        with t.run() as samples:
+            for bq in batch_quotes:
+                timed_batches(samples, classify_quotes)(ref, bq, classify_market_status)
+
+    # news：只有強勢/翻揚的股票會查新聞，模擬查詢換成直接評分合成標題
+    classified = classify_quotes(ref, snapshot.quotes, classify_market_status)
+    wants_news = MarketStatusStrategy(news_lookup=None).wants_news
+    wanted = [r.name for r in classified.itertuples(index=False) if wants_news(r.status)][:NEWS_SAMPLE]
+    t = stages['news'] = StageTimer(len(wanted))
+    for _ in range(repeat):
+        with t.run() as samples:
+            pool = NewsWorkerPool(timed_batches(samples, lambda name: score_titles([name, *SAMPLE_TITLES])))
+            for name in wanted:
+                pool.submit(name)
+            pool.drain()
+
+    t = stages['report'] = StageTimer(n)
+    news = {name: ("合成標題", 1, "消息中性") for name in wanted}
+    for _ in range(repeat):
+        with t.run() as samples, quiet():
+            for strategy in (LowBandStrategy(os.path.join(workdir, 'report_low.csv')),
+                             MarketStatusStrategy(os.path.join(workdir, 'report_news.csv'),
+                                                  news_lookup=lambda name: news[name])):
+                timed_batches(samples, strategy.run)(snapshot, ref)
+
+    return {name: stage.summary() for name, stage in stages.items()}
+
+def compare(results, baseline_path, tolerance):
+    """與舊的結果比較吞吐量，變慢超過 tolerance 的階段標成退步"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\n📊 與 {baseline['commit']} 比較 (吞吐量倍率，>1 代表變快)")
+    if baseline.get('fetch_mode') != results['fetch_mode']:
+        print(f"⚠️ fetch 模式不同 ({baseline.get('fetch_mode')} vs {results['fetch_mode']})，fetch 階段不能直接比")
+    regressions = 0
+    for size, stages in results['universes'].items():
+        old_stages = baseline['universes'].get(size, {})
+        for name, stage in stages.items():
+            old = old_stages.get(name)
+            if not old or not old['throughput'] or not stage['throughput']:
+                continue
+            ratio = stage['throughput'] / old['throughput']
+            flag = ""
+            if ratio < 1 - tolerance:
+                flag = "  ⚠️ 退步"
+                regressions += 1
+            print(f"  {size:>7} {name:<9} {ratio:6.2f}x{flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="掃描流程效能測試：合成 1k/10k/100k 檔的市場，逐階段計時並輸出 JSON")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--http', action='store_true', help="fetch 階段透過 fake_servers 本機 HTTP 伺服器 (較慢但較真實)")
+    parser.add_argument('--scanner', choices=['sniper_news', 'sniper_fast', 'sniper_stable'],
+                        help="fetch 階段照這個掃描程式的批次大小與休息時間 (休息時間加進總時間，不真的睡)")
+    parser.add_argument('--out', help=f"結果 JSON 路徑 (預設 {RESULTS_DIR}/<commit>.json)")
+    parser.add_argument('--compare', help="與之前的結果 JSON 比較")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="吞吐量掉多少算退步 (預設 10%%)")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'fetch_mode': ('http' if args.http else 'memory') + (f":{args.scanner}" if args.scanner else ''),
+        'batch_size': args.batch_size,
+        'universes': {},
+    }
+    workdir = tempfile.mkdtemp(prefix='bench_scan_')
+    try:
+        for n in args.sizes:
+            print(f"⏱️ {n} 檔...", file=sys.stderr)
+            results['universes'][str(n)] = bench_universe(n, workdir, args.repeat, args.batch_size, args.http, args.scanner)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=1)
+    print(json.dumps(results, ensure_ascii=False, indent=1))
+    print(f"💾 已存到 {out}", file=sys.stderr)
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
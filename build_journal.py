@@ -0,0 +1,80 @@
+import os
+import json
+import datetime
+
+# --- 設定區 ---
+JOURNAL_FILE = 'build_journal.jsonl'  # 每處理完一檔記一行
+BATCH_SIZE = 20                       # 每累積幾筆寫入磁碟一次
+
+class BuildJournal:
+    """data_builder 的進度日誌：記錄今天每檔股票處理成功或失敗，
+    中斷後可以從日誌接續 (--resume)，或只重跑失敗的股票 (--retry-failed)"""
+
+    def __init__(self, path=JOURNAL_FILE, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.today = str(datetime.date.today())
+        self.status = {}   # code -> 今天最後一次的紀錄
+        self.pending = []
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        stale = False
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue # 寫到一半被中斷的最後一行
+                if entry.get('date') != self.today:
+                    stale = True
+                    continue
+                self.status[entry['code']] = entry
+        if stale:
+            # 舊日期的紀錄沒用了，只保留今天的
+            self._rewrite()
+
+    def _rewrite(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self.status.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def done_today(self):
+        return {c for c, e in self.status.items() if e['status'] == 'ok'}
+
+    def failed_today(self):
+        return sorted(c for c, e in self.status.items() if e['status'] == 'fail')
+
+    def record(self, code, error=None):
+        entry = {
+            'date': self.today,
+            'code': code,
+            'status': 'ok' if error is None else 'fail',
+            'error': None if error is None else str(error),
+            'time': datetime.datetime.now().strftime('%H:%M:%S'),
+        }
+        self.status[code] = entry
+        self.pending.append(entry)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for entry in self.pending:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+        return False
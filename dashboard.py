@@ -2,27 +2,80 @@ import streamlit as st
 import pandas as pd
 import glob
 import os
+import history_store
+import metrics
+from signal_archive import SignalArchive, read_report
+
+metrics.setup('dashboard') # SNIPER_METRICS=1 時每次重繪都更新 metrics/dashboard.prom
+
+# --- 設定區 ---
+REPORT_PATTERN = 'sniper_report*.csv'
+PAGE_SIZE = 50  # 表格每頁幾列 (只有這一頁會套用顏色格式)
+
+# 定義新版的所有訊號
+ALL_POSSIBLE_SIGNALS = [
+    "🚀 突破新高", "🔥 即將創高",
+    "🐂 強勢多頭", "📉 高檔回檔",
+    "⚡ 底部翻揚", "💤 低檔盤整", "🟢 歷史極低",
+    "⚖️ 區間震盪"
+]
+
+@st.cache_data(show_spinner=False, ttl=30)
+def find_reports(folder_mtime):
+    """列出所有報表 (新的在前)。folder_mtime 是資料夾的修改時間，有新增/刪除檔案會馬上重新掃描；
+    既有報表被覆寫 (資料夾時間不變) 則最多 30 秒後重新排序"""
+    return sorted(glob.glob(REPORT_PATTERN), key=os.path.getmtime, reverse=True)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_report(path, mtime):
+    """讀取報表並整理成固定欄位與型別 (以路徑 + 修改時間為快取 key，檔案被覆寫才會重讀)
+    舊報表或低檔10% 報表缺少的欄位會給預設值"""
+    df = read_report(path)
+    # 關鍵字搜尋用：兩個文字欄位先接好，篩選時只要掃一次
+    search_text = df['AI備註'] + "\n" + df['新聞快訊']
+    return df, search_text
+
+@st.cache_resource
+def get_archive():
+    return SignalArchive()
+
+@st.cache_data(show_spinner=False, ttl=30)
+def sync_archive(folder_mtime):
+    """把還沒匯入 (或被覆寫過) 的報表匯入訊號歷史資料庫，已匯入的檔案只比對修改時間"""
+    return get_archive().ingest()
+
+def color_signal(val):
+    # 定義顏色格式
+    color = 'black'
+    if '新高' in val: color = 'red'
+    elif '底部' in val or '翻揚' in val: color = 'green'
+    elif '即將' in val: color = 'orange'
+    elif '極低' in val: color = 'blue'
+    return f'color: {color}; font-weight: bold;'
+
+def style_signals(page_df):
+    styler = page_df.style
+    # pandas 2.1 起改名為 Styler.map (applymap 在 pandas 3 已移除)
+    style_map = getattr(styler, 'map', None) or styler.applymap
+    return style_map(color_signal, subset=['訊號'])
 
 st.set_page_config(page_title="StockSniper 戰情室", layout="wide")
 st.title("🎯 StockSniper 股市狙擊手 - 戰情室")
 st.markdown("---")
 
 # 1. 自動讀取最新報表
-list_of_files = glob.glob('sniper_report*.csv') 
+list_of_files = find_reports(os.stat('.').st_mtime_ns)
 if not list_of_files:
     st.error("❌ 找不到報表檔案！請先執行 sniper_news.py 進行掃描。")
     st.stop()
 
-latest_file = max(list_of_files, key=os.path.getctime)
+sync_archive(os.stat('.').st_mtime_ns)
+latest_file = list_of_files[0]
 st.sidebar.info(f"📅 報表來源：{os.path.basename(latest_file)}")
 
 try:
-    # 強制將代號讀取為字串，避免後續相加出錯
-    df = pd.read_csv(latest_file, dtype={'代號': str})
-    
-    # 相容性檢查：如果舊報表沒有這個欄位，給予預設值
-    if '距低點(%)' not in df.columns: df['距低點(%)'] = 0.0
-        
+    with metrics.timer('dashboard.load'):
+        df, search_text = load_report(latest_file, os.path.getmtime(latest_file))
 except Exception as e:
     st.error(f"檔案讀取失敗: {e}")
     st.stop()
@@ -30,14 +83,6 @@ except Exception as e:
 # --- 2. 側邊欄篩選器 ---
 st.sidebar.header("🔍 戰略篩選")
 
-# 定義新版的所有訊號
-ALL_POSSIBLE_SIGNALS = [
-    "🚀 突破新高", "🔥 即將創高", 
-    "🐂 強勢多頭", "📉 高檔回檔",
-    "⚡ 底部翻揚", "💤 低檔盤整", "🟢 歷史極低",
-    "⚖️ 區間震盪"
-]
-
 # 找出目前 CSV 裡實際存在的訊號
 existing_signals = df['訊號'].unique().tolist() if not df.empty else []
 
@@ -51,44 +96,44 @@ selected_signals = st.sidebar.multiselect(
     default=valid_defaults        # 預設只勾選目前有的
 )
 
+selected_markets = st.sidebar.multiselect("🏛️ 市場", options=["上市", "上櫃"], default=["上市", "上櫃"])
 price_range = st.sidebar.slider("💰 價格範圍 (元)", 0, 2000, (10, 200))
 diff_range = st.sidebar.slider("📉 距低點範圍 (%)", 0.0, 100.0, (0.0, 50.0))
 news_keyword = st.sidebar.text_input("📰 新聞關鍵字 (例: 營收, 獲利)")
 
 # --- 3. 篩選邏輯 ---
-if not df.empty:
-    mask = (
-        (df['現價'] >= price_range[0]) & 
-        (df['現價'] <= price_range[1]) &
-        (df['訊號'].isin(selected_signals)) &
-        (df['距低點(%)'] >= diff_range[0]) & 
-        (df['距低點(%)'] <= diff_range[1])
-    )
-    
-    if news_keyword:
-        mask = mask & (df['AI備註'].str.contains(news_keyword, na=False) | df['新聞快訊'].str.contains(news_keyword, na=False))
-
-    filtered_df = df[mask]
-else:
-    filtered_df = pd.DataFrame()
+with metrics.timer('dashboard.filter'):
+    if not df.empty:
+        mask = (
+            df['現價'].between(price_range[0], price_range[1]) &
+            df['訊號'].isin(selected_signals) &
+            df['市場'].isin(selected_markets) &
+            df['距低點(%)'].between(diff_range[0], diff_range[1])
+        )
+
+        if news_keyword:
+            mask &= search_text.str.contains(news_keyword, regex=False)
+
+        filtered_df = df[mask]
+    else:
+        filtered_df = pd.DataFrame()
 
 # --- 4. 顯示結果 ---
 st.subheader(f"📊 篩選結果：共 {len(filtered_df)} 檔")
 
 if not filtered_df.empty:
-    # 定義顏色格式
-    def color_signal(val):
-        color = 'black'
-        if '新高' in val: color = 'red'
-        elif '底部' in val or '翻揚' in val: color = 'green'
-        elif '即將' in val: color = 'orange'
-        elif '極低' in val: color = 'blue'
-        return f'color: {color}; font-weight: bold;'
+    # 只格式化目前這一頁 (Styler 逐格套用，整張表上色會拖慢每次互動)
+    pages = (len(filtered_df) - 1) // PAGE_SIZE + 1
+    page = st.number_input(f"頁數 (共 {pages} 頁)", 1, pages, 1) if pages > 1 else 1
+    page_df = filtered_df.iloc[(page - 1) * PAGE_SIZE : page * PAGE_SIZE]
 
+    with metrics.timer('dashboard.style'):
+        styled = style_signals(page_df)
     st.dataframe(
-        filtered_df.style.applymap(color_signal, subset=['訊號']),
+        styled,
         column_config={
             "代號": st.column_config.TextColumn("代號"),
+            "市場": st.column_config.TextColumn("市場", width="small"),
             "現價": st.column_config.NumberColumn("現價", format="$%.1f"),
             "距低點(%)": st.column_config.NumberColumn("距低點", format="%.1f%%"),
             "AI備註": st.column_config.TextColumn("AI 分析", width="medium"),
@@ -97,31 +142,59 @@ if not filtered_df.empty:
         use_container_width=True, # 使用新版參數
         hide_index=True
     )
-    
+
     st.markdown("### 📝 個股詳細資訊")
-    
+
     # 這裡確保代號是字串，不會報錯
     stock_options = filtered_df['代號'].astype(str) + " " + filtered_df['名稱']
     target = st.selectbox("請選擇一檔股票:", stock_options)
-    
+
     if target:
         code = target.split(" ")[0]
         row = filtered_df[filtered_df['代號'] == code].iloc[0]
-        
+
         c1, c2, c3 = st.columns(3)
         c1.metric("價格", f"{row['現價']} 元", row['訊號'])
         c2.metric("位階", f"距低點 {row['距低點(%)']}%")
-        
+        c3.metric("市場", row['市場'])
+
         st.markdown(f"[📈 前往 Yahoo 股市: {code}](https://tw.stock.yahoo.com/quote/{code})")
-        
-        if pd.notna(row.get('新聞快訊')) and row['新聞快訊'] != "無近期新聞":
+
+        # 本地歷史資料庫有資料的話，順便畫出近 200 日收盤走勢
+        bars = history_store.load_history(code)
+        if bars is not None and len(bars) > 0:
+            recent = bars[-200:]
+            st.line_chart(pd.DataFrame({'收盤價': recent['close']}, index=pd.to_datetime(recent['date'])))
+
+        if row['新聞快訊'] and row['新聞快訊'] != "無近期新聞":
              st.info(f"📰 最新標題: {row['新聞快訊']}")
-             
-        if pd.notna(row.get('AI備註')) and row['AI備註'] != "-":
+
+        if row['AI備註'] and row['AI備註'] != "-":
             st.success(f"🤖 AI 分析: {row['AI備註']}")
 
+        history = get_archive().history(code)
+        if len(history) > 1:
+            st.markdown(f"#### 🗂️ 訊號歷史 (共 {len(history)} 筆)")
+            st.dataframe(history, use_container_width=True, hide_index=True)
+
 else:
     st.warning("⚠️ 沒有符合條件的股票，請放寬篩選條件。")
 
+# --- 5. 連續訊號 (訊號歷史資料庫) ---
+st.markdown("---")
+st.markdown("### 🔁 連續訊號追蹤")
+c1, c2 = st.columns([3, 1])
+streak_signal = c1.selectbox("訊號", ALL_POSSIBLE_SIGNALS, index=ALL_POSSIBLE_SIGNALS.index("⚡ 底部翻揚"))
+streak_days = c2.number_input("連續掃描日數", 2, 30, 3)
+with metrics.timer('dashboard.streak'):
+    streak_df = get_archive().streak(streak_signal, int(streak_days))
+if streak_df.empty:
+    st.caption(f"最近 {streak_days} 個掃描日沒有連續出現「{streak_signal}」的股票 (或歷史資料不足)。")
+else:
+    st.dataframe(streak_df, use_container_width=True, hide_index=True)
+
+metrics.write()
+
 if st.sidebar.button("🔄 刷新報表"):
-    st.rerun()
\ No newline at end of file
+    st.cache_data.clear()
+    st.rerun()
@@ -1,87 +1,217 @@
 import twstock
 import pandas as pd
-import time
+import numpy as np
 import os
-import random
+import datetime
+import argparse
+import history_store
+import fetch_engine
+import metrics
+import indicators
+import technicals
+import reference_table
+from build_journal import BuildJournal
 
 # --- 設定區 ---
-# 是否跑全市場？(True: 跑 1000 檔, False: 測試跑 30 檔)
+# 是否跑全市場？(True: 上市 + 上櫃約 1800 檔, False: 測試跑 30 檔)
 # 建議第一次先設 False 跑跑看，確認流程順利
 RUN_ALL = True  
 TEST_COUNT = 30 
 START_CODE = '1101' # 從台泥開始
+MARKETS = ('twse', 'tpex')  # 上市 + 上櫃 (twstock.twse / twstock.tpex)
+CSV_FILE = 'stock_db.csv'
+HISTORY_DAYS = 395  # 新股票回補的天數 (13 個月，確保湊滿 200 個交易日)
 
 def get_name(code):
     return twstock.codes[code].name if code in twstock.codes else code
 
-def build_database():
+def list_universe(markets=MARKETS):
+    """要建檔的股票：各市場 4 碼、START_CODE 之後的代號 (跳過 00xx 的 ETF)"""
+    codes = set()
+    for market in markets:
+        codes.update(c for c in getattr(twstock, market).keys() if len(c) == 4 and c >= START_CODE)
+    return sorted(codes)
+
+def derive_reference(code, state, bars):
+    """由滾動指標狀態 (indicators.IndicatorState) 與整份日 K 產生 stock_db.csv 的一列 (資料不足 200 天回傳 None)
+    RSI、MACD、KD、布林通道、均量、ATR 由 technicals 對整份歷史一次算完 (有裝 TA-Lib 就用 TA-Lib)"""
+    if state is None or not state.ready:
+        return None
+
+    with metrics.timer('build.technicals'):
+        technical = technicals.latest(bars)
+    return {
+        'code': code,
+        'name': get_name(code),
+        'market': fetch_engine.data_source(code), # twse 上市 / tpex 上櫃
+        'low_200': state.low.value,   # 近 200 天
+        'high_200': state.high.value,
+        'ma5_ref': state.ma(5),       # 昨天的 MA5 (作為參考)
+        'ma20_ref': state.ma(20),     # 昨天的 MA20
+        'last_update': state.last_date,
+        **technical
+    }
+
+def export_reference_db(codes=None):
+    """從本地歷史資料庫重新產生 stock_db.csv (不需連網，幾秒內完成)
+    每檔的指標狀態存在 indicator_state.json，只需要把新的日 K 接著算下去 (每根 O(1))"""
+    if codes is None:
+        codes = history_store.list_codes()
+
+    states = indicators.load_states()
+    data_list = []
+    trailing = [] # 最近 20 根收盤價 (盤中算即時均線用)
+    rebuilt = 0
+    for code in codes:
+        bars = history_store.load_history(code)
+        if bars is None or len(bars) == 0:
+            states.pop(code, None)
+            continue
+        with metrics.timer('build.derive'):
+            states[code], fresh = indicators.advance(states.get(code), bars)
+            row = derive_reference(code, states[code], bars)
+        rebuilt += fresh
+        if row is not None:
+            data_list.append(row)
+            trailing.append(bars['close'][-reference_table.TRAILING_DAYS:])
+
+    # 只保留這次名單裡的股票 (下市的狀態一併清掉)
+    indicators.save_states({code: states[code] for code in codes if code in states})
+    metrics.count('indicator_rebuilds_total', rebuilt)
+    df = pd.DataFrame(data_list)
+    df.to_csv(CSV_FILE, index=False, encoding='utf-8-sig')
+    reference_table.save_closes([row['code'] for row in data_list],
+                                np.array(trailing).reshape(len(trailing), reference_table.TRAILING_DAYS), CSV_FILE)
+    return df
+
+def fetch_start_month(code, full=False):
+    """決定這檔要從哪個月開始抓：
+    - 本地沒有歷史 (新上市) 或指定 full：回補 13 個月 (多抓一個月當緩衝)
+    - 已有歷史：從最後一筆資料所在的月份開始補 (該月重抓，確保月中資料完整)
+    已經是今天的資料就回傳 None (不用抓)"""
+    last = None if full else history_store.last_date(code)
+    if last is None:
+        past = datetime.datetime.now() - datetime.timedelta(days=HISTORY_DAYS)
+        return past.year, past.month
+    if last >= datetime.date.today():
+        return None
+    return last.year, last.month
+
+def merge_and_save(code, data, full=False):
+    """把新抓到的資料與本地歷史合併後存回，回傳合併後的日 K"""
+    # [資料清洗] 過濾掉 None 的價格
+    new_bars = history_store.bars_from_twstock(data)
+    old_bars = None if full else history_store.load_history(code, mmap=False)
+    bars = history_store.merge_bars(old_bars, new_bars)
+    history_store.save_history(code, bars)
+    return bars
+
+def drop_delisted(universe):
+    """本地有歷史、但已不在上市名單中的股票 (下市) 直接移除"""
+    delisted = [c for c in history_store.list_codes() if c not in universe]
+    for code in delisted:
+        history_store.delete_history(code)
+    if delisted:
+        print(f"🗑️ 移除已下市股票: {', '.join(delisted)}")
+    return delisted
+
+def build_database(full=False, max_rps=fetch_engine.MAX_RPS, workers=fetch_engine.CONCURRENCY,
+                   resume=False, retry_failed=False, markets=MARKETS):
     print("🚀 開始建立/更新 股票歷史數據庫...")
     
-    # 1. 篩選股票名單 (只抓 4 碼上市股)
-    all_codes = sorted([c for c in twstock.twse.keys() if len(c) == 4 and c >= START_CODE])
+    # 1. 篩選股票名單 (只抓 4 碼股票，上市與上櫃)
+    all_codes = list_universe(markets)
     
     if not RUN_ALL:
         print(f"⚠️ 測試模式：僅處理前 {TEST_COUNT} 檔股票")
         all_codes = all_codes[:TEST_COUNT]
+    elif set(markets) >= set(MARKETS):
+        # 測試模式或只跑部分市場時名單不完整，不能拿來判斷下市
+        drop_delisted(set(all_codes))
     
-    print(f"預計處理: {len(all_codes)} 檔股票 (抓歷史資料較慢，請耐心等待...)")
+    universe = all_codes
+    journal = BuildJournal()
+    if retry_failed:
+        all_codes = [c for c in journal.failed_today() if c in universe]
+        print(f"🔁 重試模式：只處理今天失敗的 {len(all_codes)} 檔")
+    elif resume:
+        done_codes = journal.done_today()
+        all_codes = [c for c in all_codes if c not in done_codes]
+        print(f"⏯️ 接續模式：今天已完成 {len(universe) - len(all_codes)} 檔，剩下 {len(all_codes)} 檔")
     
-    data_list = []
+    mode = "完整重抓" if full else "增量更新"
+    print(f"預計處理: {len(all_codes)} 檔股票 ({mode}，新上市股票會自動回補完整歷史)")
     
-    # 2. 開始迴圈抓資料
-    for i, code in enumerate(all_codes):
-        try:
-            # 顯示進度條的概念
-            print(f"[{i+1}/{len(all_codes)}] 處理 {code}...", end="\r")
-            
-            # 取得 13 個月前的日期 (多抓一個月當緩衝)
-            past = datetime.datetime.now() - datetime.timedelta(days=395)
-            
-            stock = twstock.Stock(code)
-            # 自動抓取那時候到現在的資料
-            stock.fetch_from(past.year, past.month)
-            
-            # [資料清洗] 過濾掉 None 的價格
-            clean_prices = [p for p in stock.price if p is not None]
-            
-            if len(clean_prices) < 200:
-                continue # 資料不足跳過
+    # 2. 多執行緒抓資料 (共用限速器，被擋時自動退避)
+    jobs = []
+    with metrics.timer('build.plan'):
+        for code in all_codes:
+            start = fetch_start_month(code, full)
+            if start is not None: # None 代表今天已經更新過
+                jobs.append((code, start))
+    print(f"需要連網更新: {len(jobs)} 檔 (速率上限 證交所、櫃買中心各 {max_rps} req/s，{workers} 條執行緒)")
+    
+    done = 0
+    try:
+        with journal:
+            for code, data, error in fetch_engine.fetch_all(jobs, max_rps=max_rps, concurrency=workers):
+                done += 1
+                # 顯示進度條的概念
+                print(f"[{done}/{len(jobs)}] 處理 {code}...", end="\r")
                 
-            # 只看最近 200 天
-            recent_200 = clean_prices[-200:]
-            
-            # 計算關鍵數據
-            low_200 = min(recent_200)
-            high_200 = max(recent_200)
-            ma5 = sum(recent_200[-5:]) / 5
-            ma20 = sum(recent_200[-20:]) / 20 # 多算一個月線備用
-            
-            # 存入列表
-            data_list.append({
-                'code': code,
-                'name': get_name(code),
-                'low_200': low_200,
-                'high_200': high_200,
-                'ma5_ref': ma5,   # 昨天的 MA5 (作為參考)
-                'ma20_ref': ma20, # 昨天的 MA20
-                'last_update': time.strftime("%Y-%m-%d")
-            })
-            
-            # 隨機休息 (防擋)
-            time.sleep(random.uniform(0.5, 1.0))
-            
-        except Exception as e:
-            print(f"\n跳過 {code}: {e}")
-            continue
+                if error is None:
+                    try:
+                        with metrics.timer('build.merge_save'):
+                            merge_and_save(code, data, full)
+                    except Exception as e:
+                        error = e
+                
+                metrics.count('stocks_total', result='failed' if error else 'ok')
+                if error is not None:
+                    print(f"\n跳過 {code}: {error}")
+                # 進度日誌每 BATCH_SIZE 檔寫入磁碟一次，中斷也只會損失最後一批
+                journal.record(code, error)
+    except KeyboardInterrupt:
+        print("\n\n⏹️ 已中斷！進度已存檔，下次可用 --resume 接續。")
+    
+    failed = journal.failed_today()
+    if failed:
+        print(f"\n⚠️ 今天共有 {len(failed)} 檔失敗，可用 --retry-failed 重跑: {', '.join(failed[:20])}")
 
-    print("\n\n📊 資料抓取完成，正在存檔...")
+    print("\n\n📊 資料抓取完成，正在重算衍生欄位並存檔...")
     
-    # 3. 存成 CSV 檔案 (這就是我們的小型資料庫)
-    df = pd.DataFrame(data_list)
-    df.to_csv('stock_db.csv', index=False, encoding='utf-8-sig')
+    # 3. 由歷史資料庫重新產生 CSV 檔案 (抓取失敗的股票沿用上次的歷史)
+    with metrics.timer('build.export'):
+        df = export_reference_db(universe)
     
-    print(f"✅ 建檔完成！已儲存至 stock_db.csv (共 {len(df)} 筆)")
+    print(f"✅ 建檔完成！已儲存至 {CSV_FILE} (共 {len(df)} 筆)")
     print("接下來請執行 sniper_fast.py 進行快速掃描。")
 
 if __name__ == "__main__":
-    build_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="StockSniper 歷史數據庫建檔")
+    parser.add_argument('--full', action='store_true',
+                        help="忽略本地歷史，所有股票重新下載 13 個月資料")
+    parser.add_argument('--rps', type=float, default=fetch_engine.MAX_RPS,
+                        help="每秒最多幾個請求 (證交所、櫃買中心各自計算，被擋時會自動降速)")
+    parser.add_argument('--workers', type=int, default=fetch_engine.CONCURRENCY,
+                        help="同時抓取的執行緒數")
+    parser.add_argument('--market', action='append', choices=MARKETS,
+                        help="只建某個市場 (twse 上市 / tpex 上櫃，可重複指定，預設兩個都建)")
+    parser.add_argument('--resume', action='store_true',
+                        help="接續上次中斷的進度，跳過今天已完成的股票")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="只重跑今天失敗的股票")
+    parser.add_argument('--export-only', action='store_true',
+                        help="不連網，直接由本地歷史資料庫 (history/) 重新產生 stock_db.csv")
+    parser.add_argument('--metrics', action='store_true',
+                        help=f"輸出各階段耗時與請求統計到 {metrics.METRICS_DIR}/ (Prometheus 文字格式 + JSON)")
+    args = parser.parse_args()
+
+    metrics.setup('data_builder', args.metrics or None)
+
+    if args.export_only:
+        df = export_reference_db()
+        print(f"✅ 已由本地歷史資料庫產生 {CSV_FILE} (共 {len(df)} 筆)")
+    else:
+        build_database(full=args.full, max_rps=args.rps, workers=args.workers,
+                       resume=args.resume, retry_failed=args.retry_failed, markets=args.market or MARKETS)
\ No newline at end of file
@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import random
+import socket
+import struct
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# --- 設定區 ---
+RECORDINGS_DIR = 'recordings'
+EMPTY_RSS = b'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel></channel></rss>'
+
+def news_key(query):
+    """新聞查詢字串 -> 錄製檔名"""
+    return hashlib.md5(query.encode('utf-8')).hexdigest()
+
+class FaultPlan:
+    """假伺服器的行為設定：延遲、錯誤注入、速率限制 (固定 seed，每次結果都一樣)"""
+
+    def __init__(self, latency=(0.0, 0.0), error_rate=0.0, reset_rate=0.0, max_rps=None, seed=0):
+        self.latency = latency if isinstance(latency, (tuple, list)) else (latency, latency)
+        self.error_rate = error_rate   # 回傳非 JSON (twstock 會變成 rtcode 5000 / 掃描端看到 None)
+        self.reset_rate = reset_rate   # 直接 RST 斷線 (Connection reset)
+        self.max_rps = max_rps         # 超過就 RST，模擬證交所擋 IP
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.counts = {'requests': 0, 'errors': 0, 'resets': 0, 'rate_limited': 0}
+
+    def decide(self):
+        """回傳 (延遲秒數, 'ok' / 'error' / 'reset' / 'rate_limited')"""
+        with self.lock:
+            self.counts['requests'] += 1
+            delay = self.rng.uniform(*self.latency)
+            if self.max_rps:
+                now = time.monotonic()
+                if now - self.window_start >= 1.0:
+                    self.window_start, self.window_count = now, 0
+                self.window_count += 1
+                if self.window_count > self.max_rps:
+                    self.counts['rate_limited'] += 1
+                    return delay, 'rate_limited'
+            roll = self.rng.random()
+            if roll < self.reset_rate:
+                self.counts['resets'] += 1
+                return delay, 'reset'
+            if roll < self.reset_rate + self.error_rate:
+                self.counts['errors'] += 1
+                return delay, 'error'
+            return delay, 'ok'
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    server_version = "FakeTWSE/1.0"
+
+    def log_message(self, *args):
+        pass # 不要洗版
+
+    def finish(self):
+        try:
+            super().finish()
+        except OSError:
+            pass # 已經 RST 掉的連線
+
+    def _reset(self):
+        # SO_LINGER 0 再關閉 -> 用戶端收到 Connection reset
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        self.connection.close()
+        self.close_connection = True
+
+    def _send(self, body, content_type, status=200, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        delay, action = self.server.faults.decide()
+        if delay:
+            time.sleep(delay)
+        if action in ('reset', 'rate_limited'):
+            return self._reset()
+        if action == 'error':
+            return self._send(b'<html>error</html>', 'text/html')
+        self.route(url.path, params)
+
+class FakeQuoteHandler(_ReplayHandler):
+    """重播 mis.twse.com.tw 的 getStockInfo.jsp (twstock.realtime 與 realtime_pipeline 都能用)"""
+
+    def route(self, path, params):
+        if path.endswith('/index.jsp'):
+            return self._send(b'ok', 'text/html')
+        if path.endswith('/getStockInfo.jsp'):
+            channels = params.get('ex_ch', [''])[0].split('|')
+            codes = [ch.split('_', 1)[-1].rsplit('.', 1)[0] for ch in channels if ch]
+            items = [self.server.quotes[c] for c in codes if c in self.server.quotes]
+            body = json.dumps({'msgArray': items, 'rtcode': '0000', 'rtmessage': 'OK'}, ensure_ascii=False)
+            return self._send(body.encode('utf-8'), 'application/json')
+        self._send(b'not found', 'text/plain', status=404)
+
+class FakeNewsHandler(_ReplayHandler):
+    """重播 Google News RSS，支援 ETag 條件式請求"""
+
+    def route(self, path, params):
+        query = params.get('q', [''])[0]
+        body = self.server.news.get(news_key(query), EMPTY_RSS)
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self._send(body, 'application/xml', headers={'ETag': etag})
+
+class FakeHistoryHandler(_ReplayHandler):
+    """重播證交所 STOCK_DAY 與櫃買中心的個股日成交資訊 (twstock.Stock 每月一個請求)
+    server.history 為 {代號: [STOCK_DAY 格式的列, ...]}，日期是民國年 (例如 '113/05/02')"""
+
+    def _month(self, code, year, month):
+        prefix = f"{year - 1911}/{month:02d}/"
+        return [row for row in self.server.history.get(code, []) if row[0].startswith(prefix)]
+
+    def route(self, path, params):
+        if path.endswith('/STOCK_DAY'):
+            date = params.get('date', [''])[0]  # 20240501
+            rows = self._month(params.get('stockNo', [''])[0], int(date[:4]), int(date[4:6]))
+            body = {'stat': 'OK', 'data': rows} if rows else {'stat': '很抱歉，沒有符合條件的資料!'}
+        elif path.endswith('/tradingStock'):
+            year, month, _ = params.get('date', [''])[0].split('/')  # 2024/05/01
+            rows = self._month(params.get('code', [''])[0], int(year), int(month))
+            body = {'stat': 'ok', 'tables': [{'data': rows}] if rows else []}
+        else:
+            return self._send(b'not found', 'text/plain', status=404)
+        self._send(json.dumps(body, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+class FakeServer:
+    """在背景執行緒啟動的本機假伺服器，可當 context manager 使用"""
+
+    def __init__(self, handler, faults=None, port=0, **data):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.faults = faults or FaultPlan()
+        for k, v in data.items():
+            setattr(self.httpd, k, v)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_port}"
+
+    @property
+    def counts(self):
+        return self.httpd.faults.counts
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+def load_recording(name, root=RECORDINGS_DIR):
+    """讀取 recorder.py 錄下來的報價與新聞 -> (quotes {code: msgArray 項目}, news {key: RSS bytes})"""
+    folder = os.path.join(root, name)
+    with open(os.path.join(folder, 'quotes.json'), encoding='utf-8') as f:
+        quotes = json.load(f)
+    news = {}
+    news_dir = os.path.join(folder, 'news')
+    if os.path.isdir(news_dir):
+        for fname in os.listdir(news_dir):
+            if fname.endswith('.xml'):
+                with open(os.path.join(news_dir, fname), 'rb') as f:
+                    news[fname[:-4]] = f.read()
+    return quotes, news
+
+def quote_server(quotes, faults=None, port=0):
+    return FakeServer(FakeQuoteHandler, faults, port, quotes=quotes)
+
+def news_server(news, faults=None, port=0):
+    return FakeServer(FakeNewsHandler, faults, port, news=news)
+
+def history_server(history, faults=None, port=0):
+    return FakeServer(FakeHistoryHandler, faults, port, history=history)
+
+def use_fake_servers(quote_url=None, news_url=None, history_url=None):
+    """把所有報價 / 新聞 / 日 K 歷史來源都指到本機假伺服器"""
+    if quote_url:
+        import twstock
+        import realtime_pipeline
+        realtime_pipeline.use_quote_server(quote_url)
+        twstock.realtime.SESSION_URL = quote_url + '/stock/index.jsp'
+        twstock.realtime.STOCKINFO_URL = quote_url + '/stock/api/getStockInfo.jsp?ex_ch={stock_id}&_={time}'
+    if news_url:
+        import news_scanner
+        news_scanner.NEWS_URL = news_url + '/rss/search'
+    if history_url:
+        import twstock
+        twstock.stock.TWSEFetcher.REPORT_URL = history_url + '/exchangeReport/STOCK_DAY'
+        twstock.stock.TPEXFetcher.REPORT_URL = history_url + '/www/zh-tw/afterTrading/tradingStock'
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="啟動本機假證交所 / 假 Google News 伺服器，重播錄製的資料")
+    parser.add_argument('recording', help="recordings/ 底下的錄製名稱")
+    parser.add_argument('--quote-port', type=int, default=8081)
+    parser.add_argument('--news-port', type=int, default=8082)
+    parser.add_argument('--latency', type=float, nargs=2, default=(0.05, 0.2), metavar=('MIN', 'MAX'))
+    parser.add_argument('--error-rate', type=float, default=0.0, help="回傳壞掉 JSON 的比例")
+    parser.add_argument('--reset-rate', type=float, default=0.0, help="直接斷線的比例")
+    parser.add_argument('--max-rps', type=float, default=None, help="每秒超過幾個請求就斷線")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    quotes, news = load_recording(args.recording)
+    faults = dict(latency=tuple(args.latency), error_rate=args.error_rate,
+                  reset_rate=args.reset_rate, max_rps=args.max_rps)
+    with quote_server(quotes, FaultPlan(seed=args.seed, **faults), args.quote_port) as qs, \
+         news_server(news, FaultPlan(seed=args.seed + 1, **faults), args.news_port) as ns:
+        print(f"📼 重播 {args.recording}：{len(quotes)} 檔報價、{len(news)} 則新聞查詢")
+        print(f"   報價: {qs.url}   新聞: {ns.url}   (Ctrl-C 結束)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\n", "報價:", qs.counts, "新聞:", ns.counts)
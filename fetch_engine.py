@@ -0,0 +1,174 @@
+import threading
+import itertools
+import time
+import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+import twstock
+import metrics
+
+# --- 設定區 ---
+MAX_RPS = 2.0        # 每秒最多幾個請求 (同一個來源的所有執行緒共用，證交所與櫃買中心各自計算)
+MIN_RPS = 0.2        # 被擋時最低降到多少
+CONCURRENCY = 8      # 同時幾個執行緒在抓 (上市、上櫃兩個來源平分)
+MAX_RETRIES = 3      # 單一月份被拒絕時最多重試幾次
+COOLDOWN = 10        # 第一次被拒絕時全體暫停秒數 (連續被拒會加倍)
+MAX_COOLDOWN = 60    # 暫停秒數上限 (原本的「IP 冷卻 60 秒」)
+
+SOURCE_NAMES = {'twse': '證交所', 'tpex': '櫃買中心'}
+
+class RequestRefused(Exception):
+    """證交所/櫃買中心拒絕連線或回傳空白 (通常是請求太快被擋)"""
+
+def data_source(code):
+    """日 K 歷史的來源：上市 'twse' (證交所)、上櫃 'tpex' (櫃買中心)"""
+    info = twstock.codes.get(code)
+    return info.data_source if info is not None else 'twse'
+
+def is_refusal(err):
+    msg = str(err)
+    return (isinstance(err, (RequestRefused, ConnectionError, requests.exceptions.ConnectionError))
+            or "Connection" in msg or "RemoteDisconnected" in msg)
+
+class TokenBucket:
+    """共用的 token bucket 限速器：平均每秒 rate 個請求，最多累積 burst 個"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+    def acquire(self):
+        """取得一個 token，不夠就等"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            metrics.sleep(wait, 'rate_limit')
+
+class AdaptiveLimiter:
+    """在 TokenBucket 外加上自適應退避：
+    - 被拒絕：速率減半，所有執行緒一起暫停 cooldown 秒 (連續被拒 cooldown 加倍)
+    - 連續成功：速率慢慢加回 max_rps"""
+
+    def __init__(self, max_rps=MAX_RPS, min_rps=MIN_RPS, burst=None, label='證交所'):
+        self.label = label
+        self.max_rps = max_rps
+        self.min_rps = min_rps
+        self.bucket = TokenBucket(max_rps, burst or max(1, int(max_rps)))
+        self.lock = threading.Lock()
+        self.paused_until = 0.0
+        self.cooldown = COOLDOWN
+        self.success_streak = 0
+        self.refused = 0
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def acquire(self):
+        while True:
+            wait = self.paused_until - time.monotonic()
+            if wait <= 0:
+                break
+            metrics.sleep(wait, 'ip_cooldown')
+        self.bucket.acquire()
+
+    def on_success(self):
+        with self.lock:
+            self.success_streak += 1
+            self.cooldown = COOLDOWN
+            # 每連續成功 10 次，速率回升 10%
+            if self.success_streak >= 10 and self.rate < self.max_rps:
+                self.bucket.set_rate(min(self.max_rps, self.rate * 1.1))
+                self.success_streak = 0
+
+    def on_refused(self):
+        with self.lock:
+            self.refused += 1
+            self.success_streak = 0
+            now = time.monotonic()
+            if now < self.paused_until:
+                return # 其他執行緒已經觸發冷卻了
+            self.bucket.set_rate(max(self.min_rps, self.rate / 2))
+            self.paused_until = now + self.cooldown
+            print(f"\n🛑 {self.label}拒絕連線，全體冷卻 {self.cooldown} 秒 (速率降為 {self.rate:.2f} req/s)...")
+            self.cooldown = min(MAX_COOLDOWN, self.cooldown * 2)
+
+def month_range(year, month, end=None):
+    """從 (year, month) 到 end (預設今天) 的每個月份"""
+    end = end or datetime.date.today()
+    ym = 12 * year + month - 1
+    while ym <= 12 * end.year + end.month - 1:
+        y, m = divmod(ym, 12)
+        yield y, m + 1
+        ym += 1
+
+def fetch_month(stock, year, month, limiter):
+    """抓單一月份 (一個 HTTP 請求)，被拒絕時退避後重試"""
+    source = f"{data_source(stock.sid)}_history"
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire()
+        metrics.count('requests_total', source=source)
+        try:
+            with metrics.timer('build.request'):
+                raw = stock.fetcher.fetch(year, month, stock.sid)
+            # twstock 重試多次仍解析失敗時：證交所回傳 stat 為空字串、櫃買中心回傳沒有 tables 的空資料，代表被擋
+            if raw.get('stat', 'OK') == '' or ('aaData' in raw and 'tables' not in raw):
+                raise RequestRefused(f"{stock.sid} {year}/{month:02d} 回傳空白")
+            limiter.on_success()
+            return raw['data']
+        except Exception as e:
+            refused = is_refusal(e)
+            metrics.count('errors_total', source=source, kind='refused' if refused else 'other')
+            if not refused or attempt == MAX_RETRIES:
+                raise
+            metrics.count('retries_total', source=source)
+            limiter.on_refused()
+
+def fetch_history(code, start, limiter):
+    """抓 code 從 start=(year, month) 到現在的日 K (twstock Data 列表)"""
+    stock = twstock.Stock(code, initial_fetch=False)
+    data = []
+    for year, month in month_range(*start):
+        data.extend(fetch_month(stock, year, month, limiter))
+    return data
+
+def fetch_all(jobs, max_rps=MAX_RPS, concurrency=CONCURRENCY):
+    """多執行緒抓取多檔歷史。jobs 為 [(code, (year, month)), ...]
+    依完成順序 yield (code, data, error)，error 為 None 代表成功
+    上市 (證交所) 與上櫃 (櫃買中心) 是不同網站，各自一個限速器，兩邊的速率上限都是 max_rps"""
+    limiters = {source: AdaptiveLimiter(max_rps, label=label) for source, label in SOURCE_NAMES.items()}
+    # 兩個市場交錯排隊，兩個限速器才會同時有工作
+    by_source = {}
+    for job in jobs:
+        by_source.setdefault(data_source(job[0]), []).append(job)
+    jobs = [job for group in itertools.zip_longest(*by_source.values()) for job in group if job is not None]
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = {pool.submit(fetch_history, code, start, limiters[data_source(code)]): code
+                   for code, start in jobs}
+        for future in as_completed(futures):
+            code = futures[future]
+            try:
+                yield code, future.result(), None
+            except Exception as e:
+                yield code, None, e
+    finally:
+        # 中途停止 (Ctrl-C 或呼叫端不再讀取) 時，還沒開始的工作直接取消
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,83 @@
+import os
+import datetime
+import numpy as np
+
+# --- 設定區 ---
+HISTORY_DIR = 'history'  # 每檔股票一個 .npy 檔
+
+# 日 K 資料格式 (欄式結構化陣列，可直接 mmap 讀取)
+BAR_DTYPE = np.dtype([
+    ('date', 'datetime64[D]'),
+    ('open', 'f8'),
+    ('high', 'f8'),
+    ('low', 'f8'),
+    ('close', 'f8'),
+    ('volume', 'i8'),
+])
+
+def history_path(code):
+    return os.path.join(HISTORY_DIR, f"{code}.npy")
+
+def _to_float(value):
+    return np.nan if value is None else float(value)
+
+def bars_from_twstock(data):
+    """把 twstock.Stock.data (Data namedtuple 列表) 轉成日 K 陣列，收盤價為 None 的資料會被濾掉"""
+    rows = [
+        (np.datetime64(d.date.date(), 'D'), _to_float(d.open), _to_float(d.high),
+         _to_float(d.low), float(d.close), int(d.capacity or 0))
+        for d in data if d.close is not None
+    ]
+    return np.array(rows, dtype=BAR_DTYPE)
+
+def merge_bars(old, new):
+    """合併新舊資料：同一天以新資料為準，並依日期排序"""
+    if old is None or len(old) == 0:
+        bars = np.asarray(new, dtype=BAR_DTYPE)
+    else:
+        bars = np.concatenate([np.asarray(old, dtype=BAR_DTYPE), np.asarray(new, dtype=BAR_DTYPE)])
+    # 反轉後取第一次出現 = 保留後加入的那一筆
+    _, idx = np.unique(bars['date'][::-1], return_index=True)
+    return bars[::-1][idx]
+
+def save_history(code, bars):
+    """寫入單檔歷史 (先寫暫存檔再取代，避免寫到一半中斷把舊檔弄壞)"""
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    path = history_path(code)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.asarray(bars, dtype=BAR_DTYPE))
+    os.replace(tmp_path, path)
+
+def load_history(code, mmap=True):
+    """讀取單檔歷史，預設以 mmap 唯讀開啟；沒有資料回傳 None"""
+    path = history_path(code)
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode='r' if mmap else None)
+
+def delete_history(code):
+    path = history_path(code)
+    if os.path.exists(path):
+        os.remove(path)
+
+def list_codes():
+    """目前資料庫裡有哪些股票"""
+    if not os.path.isdir(HISTORY_DIR):
+        return []
+    return sorted(f[:-4] for f in os.listdir(HISTORY_DIR) if f.endswith('.npy'))
+
+def last_date(code):
+    """該股最後一筆資料的日期 (datetime.date)，沒有資料回傳 None"""
+    bars = load_history(code)
+    if bars is None or len(bars) == 0:
+        return None
+    return bars['date'][-1].astype(datetime.date)
+
+def get_closes(code, n=None):
+    """取收盤價陣列 (n 有值時只取最近 n 筆)"""
+    bars = load_history(code)
+    if bars is None:
+        return None
+    closes = bars['close']
+    return closes if n is None else closes[-n:]
@@ -0,0 +1,198 @@
+import os
+import json
+import hashlib
+import numpy as np
+from collections import deque
+
+# --- 設定區 ---
+STATE_FILE = 'indicator_state.json'  # 每檔股票的滾動指標狀態 (data_builder 每天接著往下算)
+LONG_WINDOW = 200                    # 200 日高低點
+MA_WINDOWS = (5, 20)
+
+def window_checksum(closes):
+    """最近 LONG_WINDOW 根收盤價的指紋：視窗內任何一天被修正，指紋就會變"""
+    window = np.ascontiguousarray(closes[-LONG_WINDOW:], dtype=float)
+    return hashlib.md5(window.tobytes()).hexdigest()[:16]
+
+class RollingExtreme:
+    """滾動視窗的最小值 / 最大值：單調佇列，每加一筆攤還 O(1)
+    佇列裡存 (序號, 值)，由舊到新單調遞增 (min) 或遞減 (max)，隊首就是目前的極值"""
+
+    def __init__(self, window, mode='min', items=None, count=0):
+        self.window = window
+        self.mode = mode
+        self.items = deque(tuple(i) for i in (items or ()))
+        self.count = count # 總共加過幾筆 (當作序號)
+
+    def push(self, value):
+        items = self.items
+        if self.mode == 'min':
+            while items and items[-1][1] >= value:
+                items.pop()
+        else:
+            while items and items[-1][1] <= value:
+                items.pop()
+        items.append((self.count, value))
+        self.count += 1
+        if items[0][0] <= self.count - 1 - self.window:
+            items.popleft()
+        return items[0][1]
+
+    @property
+    def value(self):
+        return self.items[0][1] if self.items else None
+
+    def to_dict(self):
+        return {'window': self.window, 'mode': self.mode, 'items': list(self.items), 'count': self.count}
+
+class RollingMean:
+    """滾動平均：保留視窗內的值與累計和，每加一筆 O(1)"""
+
+    def __init__(self, window, values=None):
+        self.window = window
+        self.values = deque(values or (), maxlen=window)
+        self.total = sum(self.values)
+        self.pushes = 0
+
+    def push(self, value):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        self.pushes += 1
+        if self.pushes % self.window == 0:
+            self.total = sum(self.values) # 每 window 筆重算一次，避免浮點誤差累積 (攤還仍是 O(1))
+        return self.value
+
+    @property
+    def value(self):
+        if len(self.values) < self.window:
+            return None
+        return self.total / self.window
+
+    def preview(self, value):
+        """假設再加入 value 時的平均 (不改變狀態，給盤中即時價用)"""
+        if len(self.values) < self.window - 1:
+            return None
+        total = self.total - (self.values[0] if len(self.values) == self.window else 0)
+        return (total + value) / self.window
+
+    def to_dict(self):
+        return {'window': self.window, 'values': list(self.values)}
+
+class IndicatorState:
+    """單檔股票的滾動指標：200 日高低點、MA5、MA20
+    - update(date, close)：收盤後加入一根日 K (同一天或更早的日期會被略過)
+    - preview(price)：盤中即時價套進去算 MA (不改變狀態)
+    - checksum：算到 last_date 為止最近 LONG_WINDOW 根收盤價的指紋 (歷史被修正或補進缺漏的日子時用來發現)"""
+
+    def __init__(self, low=None, high=None, mas=None, last_date=None, last_close=None, bars=0, checksum=None):
+        self.low = low or RollingExtreme(LONG_WINDOW, 'min')
+        self.high = high or RollingExtreme(LONG_WINDOW, 'max')
+        self.mas = mas or {n: RollingMean(n) for n in MA_WINDOWS}
+        self.last_date = last_date   # 'YYYY-MM-DD'
+        self.last_close = last_close
+        self.bars = bars             # 已經加入幾根日 K
+        self.checksum = checksum
+
+    @classmethod
+    def from_bars(cls, bars):
+        """由完整日 K 重建 (新股票、--full 或歷史被修正時)"""
+        state = cls()
+        state.extend(bars)
+        state.checksum = window_checksum(bars['close'])
+        return state
+
+    def extend(self, bars):
+        """依序加入新的日 K (history_store 格式)，回傳實際加入的筆數"""
+        added = 0
+        for date, close in zip(bars['date'], bars['close']):
+            if self.update(str(date), float(close)):
+                added += 1
+        return added
+
+    def update(self, date, close):
+        if self.last_date is not None and date <= self.last_date:
+            return False
+        self.low.push(close)
+        self.high.push(close)
+        for ma in self.mas.values():
+            ma.push(close)
+        self.last_date, self.last_close = date, close
+        self.bars += 1
+        return True
+
+    def matches(self, bars):
+        """狀態是否還對得上這份日 K；歷史被修正過就要重建：
+        - 到 last_date 為止的根數相同 (沒有補進缺漏的日子)
+        - 最近 LONG_WINDOW 根收盤價的指紋相同 (視窗內沒有被修正的日子)"""
+        if self.last_date is None or self.checksum is None or len(bars) == 0:
+            return False
+        dates = bars['date'].astype(str)
+        i = dates.searchsorted(self.last_date)
+        if i >= len(bars) or dates[i] != self.last_date or i + 1 != self.bars:
+            return False
+        return window_checksum(bars['close'][:i + 1]) == self.checksum
+
+    @property
+    def ready(self):
+        return self.bars >= LONG_WINDOW
+
+    def ma(self, n):
+        return self.mas[n].value
+
+    def preview(self, price):
+        """盤中即時價套進去的 {n: MA} (今天還沒收盤，不改變狀態)"""
+        return {n: ma.preview(price) for n, ma in self.mas.items()}
+
+    def to_dict(self):
+        return {
+            'low': self.low.to_dict(),
+            'high': self.high.to_dict(),
+            'mas': {str(n): ma.to_dict() for n, ma in self.mas.items()},
+            'last_date': self.last_date,
+            'last_close': self.last_close,
+            'bars': self.bars,
+            'checksum': self.checksum,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        extreme = lambda e: RollingExtreme(e['window'], e['mode'], e['items'], e['count'])
+        return cls(
+            low=extreme(d['low']),
+            high=extreme(d['high']),
+            mas={int(n): RollingMean(m['window'], m['values']) for n, m in d['mas'].items()},
+            last_date=d['last_date'],
+            last_close=d['last_close'],
+            bars=d['bars'],
+            checksum=d.get('checksum'), # 舊版存檔沒有指紋，第一次會重建
+        )
+
+def advance(state, bars):
+    """把 state 接著算到 bars 的最後一天；沒有狀態或歷史對不上時由整份日 K 重建
+    回傳 (新狀態, 是否重建)"""
+    if state is None or (state.last_date is not None and not state.matches(bars)):
+        return IndicatorState.from_bars(bars), True
+    state.extend(bars[bars['date'].astype(str) > state.last_date] if state.last_date else bars)
+    state.checksum = window_checksum(bars['close'])
+    return state, False
+
+def load_states(path=None):
+    """讀取所有股票的指標狀態 {code: IndicatorState}，檔案不存在或壞掉時回傳空的"""
+    path = path or STATE_FILE
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return {code: IndicatorState.from_dict(d) for code, d in json.load(f).items()}
+    except (ValueError, KeyError):
+        print(f"⚠️ {path} 格式錯誤，指標會由歷史資料重新計算")
+        return {}
+
+def save_states(states, path=None):
+    path = path or STATE_FILE
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({code: s.to_dict() for code, s in states.items()}, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
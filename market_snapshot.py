@@ -0,0 +1,39 @@
+import datetime
+
+def safe_float(value):
+    """安全轉換：如果是 '-' 或壞掉的資料，回傳 None"""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+def parse_prices(realtime_data, batch):
+    """從 twstock.realtime.get 的回傳值取出 {代號: 現價}，沒成交或資料壞掉的略過"""
+    quotes = {}
+    for code in batch:
+        if code not in realtime_data or not realtime_data[code]['success']:
+            continue
+        current_price = safe_float(realtime_data[code]['realtime']['latest_trade_price'])
+        if current_price is None:
+            continue
+        quotes[code] = current_price
+    return quotes
+
+def is_throttled(realtime_data):
+    """回傳 None 或 JSON 解析失敗 (rtcode 5000，通常是抓太快) 視為被限流"""
+    return realtime_data is None or (not realtime_data.get('success') and realtime_data.get('rtcode') == '5000')
+
+def is_bad_first_item(realtime_data):
+    """twstock 只檢查批次第一檔有沒有 tlong：第一檔壞掉時整批回傳 rtcode 5002，其他檔也拿不到"""
+    return realtime_data is not None and not realtime_data.get('success') and realtime_data.get('rtcode') == '5002'
+
+class MarketSnapshot:
+    """一次全市場掃描的結果：{代號: 現價} 與抓取時間"""
+
+    def __init__(self, quotes=None, taken_at=None, skipped=None):
+        self.quotes = quotes if quotes is not None else {}
+        self.taken_at = taken_at or datetime.datetime.now()
+        self.skipped = skipped if skipped is not None else [] # 抓取失敗而跳過的代號
+
+    def __len__(self):
+        return len(self.quotes)
@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import atexit
+import datetime
+import threading
+import contextlib
+
+# --- 設定區 ---
+METRICS_DIR = 'metrics'   # 輸出 <job>.prom (Prometheus 文字格式) 與 <job>.json (執行摘要)
+PREFIX = 'stocksniper'
+ENABLED = os.environ.get('SNIPER_METRICS', '') not in ('', '0')  # 也可用 setup(job, enabled=True) 開啟
+
+_NULL = contextlib.nullcontext()
+
+class _Timer:
+    __slots__ = ('registry', 'stage', 'start')
+
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+class Metrics:
+    """一次執行的計時與計數：各階段耗時、請求/錯誤/重試次數、休息 (sleep) 秒數"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages = {}    # stage -> [次數, 總秒數, 最長秒數]
+        self.counters = {}  # (name, labels) -> 累計值
+        self.slept = {}     # 原因 -> 總秒數
+
+    def timer(self, stage):
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            s = self.stages.setdefault(stage, [0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += seconds
+            s[2] = max(s[2], seconds)
+
+    def count(self, name, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def add_sleep(self, seconds, reason):
+        with self.lock:
+            self.slept[reason] = self.slept.get(reason, 0.0) + seconds
+
+    def to_prometheus(self, job):
+        def fmt(name, value, labels=()):
+            labels = (('job', job),) + tuple(labels)
+            pairs = ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels)
+            return f"{PREFIX}_{name}{{{pairs}}} {value!r}"
+
+        lines = [f"# TYPE {PREFIX}_stage_seconds_total counter",
+                 f"# TYPE {PREFIX}_stage_calls_total counter",
+                 f"# TYPE {PREFIX}_stage_seconds_max gauge"]
+        with self.lock:
+            for stage, (calls, total, longest) in sorted(self.stages.items()):
+                lines.append(fmt('stage_seconds_total', total, [('stage', stage)]))
+                lines.append(fmt('stage_calls_total', calls, [('stage', stage)]))
+                lines.append(fmt('stage_seconds_max', longest, [('stage', stage)]))
+            lines.append(f"# TYPE {PREFIX}_sleep_seconds_total counter")
+            for reason, seconds in sorted(self.slept.items()):
+                lines.append(fmt('sleep_seconds_total', seconds, [('reason', reason)]))
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {PREFIX}_{name} counter")
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(fmt(name, value, labels))
+        lines.append(f"# TYPE {PREFIX}_run_seconds gauge")
+        lines.append(fmt('run_seconds', round(time.time() - self.started, 3)))
+        lines.append(f"# TYPE {PREFIX}_last_run_timestamp_seconds gauge")
+        lines.append(fmt('last_run_timestamp_seconds', round(time.time(), 3)))
+        return '\n'.join(lines) + '\n'
+
+    def summary(self, job):
+        with self.lock:
+            counters = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                key = ','.join(f"{k}={v}" for k, v in labels) or 'total'
+                counters.setdefault(name, {})[key] = value
+            return {
+                'job': job,
+                'started': datetime.datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'run_seconds': round(time.time() - self.started, 3),
+                'stages': {stage: {'calls': calls, 'seconds': round(total, 4), 'max_seconds': round(longest, 4),
+                                   'mean_ms': round(total / calls * 1000, 3)}
+                           for stage, (calls, total, longest) in sorted(self.stages.items())},
+                'counters': counters,
+                'slept': {reason: round(s, 3) for reason, s in sorted(self.slept.items())},
+                'slept_total': round(sum(self.slept.values()), 3),
+            }
+
+_registry = Metrics()
+_job = None
+
+# --- 模組層級的快速入口：沒開啟時幾乎零成本 (只多一次全域變數判斷) ---
+
+def timer(stage):
+    """with metrics.timer('scan.fetch'): ...  累計該階段的次數與耗時"""
+    return _registry.timer(stage) if ENABLED else _NULL
+
+def count(name, n=1, **labels):
+    """累加計數器，例如 count('requests_total', source='twse_realtime')"""
+    if ENABLED:
+        _registry.count(name, n, **labels)
+
+def sleep(seconds, reason):
+    """time.sleep 並記下休息原因 (批次間隔、IP 冷卻、退避...)"""
+    if ENABLED and seconds > 0:
+        _registry.add_sleep(seconds, reason)
+    time.sleep(seconds)
+
+def record_sleep(seconds, reason):
+    """只記錄不休息 (給 asyncio.sleep 之類自己等待的地方用)"""
+    if ENABLED and seconds > 0:
+        _registry.add_sleep(seconds, reason)
+
+def setup(job, enabled=None):
+    """程式進入點呼叫：enabled 為 None 時看環境變數 SNIPER_METRICS，開啟後結束時自動輸出"""
+    global ENABLED, _job
+    if enabled is not None:
+        ENABLED = enabled
+    if ENABLED and _job is None:
+        atexit.register(write)
+    _job = job
+
+def write(job=None, folder=METRICS_DIR):
+    """輸出 <job>.prom 與 <job>.json (可以在長時間執行的程式裡定期呼叫，覆蓋成最新狀態)"""
+    if not ENABLED:
+        return None
+    job = job or _job or 'stocksniper'
+    os.makedirs(folder, exist_ok=True)
+    prom_path = os.path.join(folder, f"{job}.prom")
+    # 先寫暫存檔再換名，Prometheus textfile collector 不會讀到寫一半的檔案
+    with open(prom_path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(_registry.to_prometheus(job))
+    os.replace(prom_path + '.tmp', prom_path)
+    with open(os.path.join(folder, f"{job}.json"), 'w', encoding='utf-8') as f:
+        json.dump(_registry.summary(job), f, ensure_ascii=False, indent=1)
+    return prom_path
+
+def summary():
+    return _registry.summary(_job or 'stocksniper')
@@ -0,0 +1,145 @@
+import os
+import csv
+import time
+import datetime
+import argparse
+import realtime_pipeline
+import metrics
+from scan_engine import load_reference
+from signals import classify_quotes, classify_market_status, BREAKOUT, NEAR_HIGH, REBOUND
+from news_scanner import scan_news
+from quote_cache import QuoteCache
+
+# --- 設定區 ---
+SCAN_EVERY = 60                     # 每幾秒重掃一次
+MARKET_OPEN = datetime.time(9, 0)
+MARKET_CLOSE = datetime.time(13, 30)
+LOG_FILE = 'monitor_log_{date}.csv' # 每個交易日一個紀錄檔
+# 只有「進入」這些狀態才發出通知 (其他狀態變化只更新記憶，不輸出)
+ALERT_SIGNALS = {BREAKOUT, NEAR_HIGH, REBOUND}
+LOG_COLUMNS = ['時間', '代號', '名稱', '現價', '距低點(%)', '前狀態', '新狀態', '新聞快訊', 'AI備註']
+
+class TransitionMonitor:
+    """記住每檔股票上一次的訊號，每輪掃描只回報「狀態改變且進入關注訊號」的股票"""
+
+    def __init__(self, ref, alert_signals=ALERT_SIGNALS, emit_initial=True):
+        self.ref = ref
+        self.alert_signals = set(alert_signals)
+        self.emit_initial = emit_initial # 第一輪已經在關注狀態的要不要也通知
+        self.last_signal = {}
+
+    def update(self, snapshot):
+        """回傳這一輪的狀態轉換 [(row, 前狀態, 新狀態), ...]"""
+        transitions = []
+        classified = classify_quotes(self.ref, snapshot.quotes, rule=classify_market_status)
+        for row in classified.itertuples(index=False):
+            prev = self.last_signal.get(row.code)
+            self.last_signal[row.code] = row.status
+            if prev == row.status or row.status not in self.alert_signals:
+                continue
+            if prev is None and not self.emit_initial:
+                continue
+            transitions.append((row, prev, row.status))
+        return transitions
+
+def log_path(day=None):
+    return LOG_FILE.format(date=day or datetime.date.today())
+
+def append_log(entries, path=None):
+    path = path or log_path()
+    new_file = not os.path.exists(path)
+    with open(path, 'a', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=LOG_COLUMNS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(entries)
+
+def in_market_hours(now=None):
+    now = now or datetime.datetime.now()
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() <= MARKET_CLOSE
+
+def next_open(now=None):
+    """下一次開盤時間：平日還沒開盤就是今天 MARKET_OPEN，否則是下一個平日的 MARKET_OPEN (國定假日不另外判斷)"""
+    now = now or datetime.datetime.now()
+    day = now.date()
+    if now.time() >= MARKET_OPEN:
+        day += datetime.timedelta(days=1)
+    while day.weekday() >= 5:
+        day += datetime.timedelta(days=1)
+    return datetime.datetime.combine(day, MARKET_OPEN)
+
+def wait_for_market():
+    """盤中直接回傳；收盤後、週末睡到下一次開盤 (常駐程式跑過夜、跑過週末都接得上)"""
+    now = datetime.datetime.now()
+    if in_market_hours(now):
+        return
+    opens = next_open(now)
+    print(f"\n💤 目前休市，{opens.strftime('%m/%d %H:%M')} 開盤後繼續")
+    metrics.sleep((opens - now).total_seconds(), 'market_closed')
+
+def run_monitor(interval=SCAN_EVERY, with_news=False, ignore_hours=False):
+    ref = load_reference()
+    if ref is None: return
+
+    # 透過共用報價快取：同時有其他掃描程式在跑時，剛抓過的報價直接共用
+    quotes = QuoteCache(fetch_fn=realtime_pipeline.get_quotes)
+    print(f"👀 盤中監控啟動：每 {interval} 秒掃描一次，只顯示狀態轉換 (Ctrl-C 結束)")
+    print(f"   關注訊號: {' / '.join(sorted(ALERT_SIGNALS))}，紀錄檔: {log_path()}")
+
+    session = None
+    try:
+        while True:
+            if not ignore_hours and not in_market_hours():
+                wait_for_market()
+                continue
+            if session != datetime.date.today():
+                # 新的交易日：重新讀參考資料 (data_builder 收盤後會更新)，狀態從頭記
+                session = datetime.date.today()
+                ref = load_reference() or ref
+                monitor = TransitionMonitor(ref)
+                codes = ref.codes.tolist()
+
+            started = time.monotonic()
+            with metrics.timer('scan.fetch'):
+                snapshot = realtime_pipeline.fetch_snapshot_concurrent(codes, quote_fn=quotes)
+            with metrics.timer('monitor.update'):
+                transitions = monitor.update(snapshot)
+
+            entries = []
+            for row, prev, status in transitions:
+                news_title, ai_remark = "", "-"
+                if with_news:
+                    news_title, _, ai_remark = scan_news(row.name)
+                print(f"[{snapshot.taken_at.strftime('%H:%M:%S')}] {row.code:<6} {row.name:<6} {row.price:<8.1f} "
+                      f"{prev or '(新)'} ➜ {status}  {ai_remark}")
+                entries.append({
+                    '時間': snapshot.taken_at.strftime('%H:%M:%S'),
+                    '代號': row.code,
+                    '名稱': row.name,
+                    '現價': row.price,
+                    '距低點(%)': round(row.diff_percent, 1),
+                    '前狀態': prev or '',
+                    '新狀態': status,
+                    '新聞快訊': news_title,
+                    'AI備註': ai_remark,
+                })
+            if entries:
+                append_log(entries)
+            print(f"[{snapshot.taken_at.strftime('%H:%M:%S')}] 本輪 {len(snapshot)} 檔，狀態轉換 {len(entries)} 檔")
+
+            metrics.write() # 每輪更新一次，Prometheus 可以持續抓
+            metrics.sleep(max(0, interval - (time.monotonic() - started)), 'interval')
+    except KeyboardInterrupt:
+        pass
+    print("👋 監控結束")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="StockSniper 盤中連續監控：只輸出訊號轉換")
+    parser.add_argument('--interval', type=int, default=SCAN_EVERY, help="每幾秒重掃一次")
+    parser.add_argument('--news', action='store_true', help="狀態轉換時順便查新聞")
+    parser.add_argument('--ignore-hours', action='store_true', help="不管開盤時間，一直掃 (測試用)")
+    parser.add_argument('--metrics', action='store_true',
+                        help=f"每輪輸出耗時與請求統計到 {metrics.METRICS_DIR}/ (Prometheus 文字格式 + JSON)")
+    args = parser.parse_args()
+    metrics.setup('monitor', args.metrics or None)
+    run_monitor(args.interval, with_news=args.news, ignore_hours=args.ignore_hours)
@@ -0,0 +1,93 @@
+import json
+import time
+import sqlite3
+import threading
+
+# --- 設定區 ---
+CACHE_FILE = 'news_cache.sqlite'
+NEWS_TTL = 30 * 60          # 30 分鐘內直接用快取，不連網
+MAX_AGE = 3 * 24 * 3600     # 超過 3 天沒用到的查詢直接刪掉
+MAX_ENTRIES = 5000          # 最多保留幾個查詢 (超過時刪最久沒用到的)
+EVICT_EVERY = 10 * 60       # 長時間執行 (monitor --news、新聞工作池) 時每隔幾秒清一次
+
+class NewsCache:
+    """新聞查詢結果的持久快取 (SQLite)，以查詢字串為 key：
+    - TTL 內：直接回傳上次解析好的標題與評分 (不連網、不跑 BeautifulSoup)
+    - 過期：帶 ETag / Last-Modified 做條件式請求，304 代表沒變，沿用舊結果"""
+
+    def __init__(self, path=CACHE_FILE, ttl=NEWS_TTL, max_age=MAX_AGE, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.hits = 0
+        self.not_modified = 0
+        self.fetched = 0
+        self._local = threading.local()
+        self._evicted_at = 0.0
+        with self._conn() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS news (
+                query TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,
+                titles TEXT, result TEXT, fetched_at REAL, accessed_at REAL, scorer TEXT)""")
+            try:
+                conn.execute("ALTER TABLE news ADD COLUMN scorer TEXT") # 舊版快取檔沒有這個欄位
+            except sqlite3.OperationalError:
+                pass
+        self.evict()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, query, fetch_fn, score_fn, scorer=None):
+        """fetch_fn(query, etag, last_modified) -> (titles 或 None 代表 304, etag, last_modified)
+        score_fn(titles) -> 評分結果 (可 JSON 化)，回傳評分結果
+        scorer 為評分規則的版本，規則改過時用存下來的標題重新評分 (不用重抓)"""
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute("SELECT etag, last_modified, titles, result, fetched_at, scorer FROM news WHERE query = ?",
+                           (query,)).fetchone()
+
+        if row and now - row[4] < self.ttl:
+            self.hits += 1
+            result = json.loads(row[3])
+            if row[5] != scorer:
+                result = score_fn(json.loads(row[2]))
+            with conn:
+                conn.execute("UPDATE news SET accessed_at = ?, result = ?, scorer = ? WHERE query = ?",
+                             (now, json.dumps(result, ensure_ascii=False), scorer, query))
+            return result
+
+        etag, last_modified = (row[0], row[1]) if row else (None, None)
+        titles, etag, last_modified = fetch_fn(query, etag, last_modified)
+        if titles is None and row:
+            # 304 Not Modified：內容沒變，沿用上次解析與評分的結果
+            self.not_modified += 1
+            titles, result = json.loads(row[2]), json.loads(row[3])
+            if row[5] != scorer:
+                result = score_fn(titles)
+        else:
+            self.fetched += 1
+            titles = titles or []
+            result = score_fn(titles)
+
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO news VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (query, etag, last_modified, json.dumps(titles, ensure_ascii=False),
+                          json.dumps(result, ensure_ascii=False), now, now, scorer))
+        if now - self._evicted_at >= EVICT_EVERY:
+            self.evict()
+        return result
+
+    def evict(self):
+        """刪掉太久沒用到的查詢，並把總數壓在 max_entries 以內"""
+        self._evicted_at = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM news WHERE accessed_at < ?", (time.time() - self.max_age,))
+            conn.execute("""DELETE FROM news WHERE query NOT IN (
+                SELECT query FROM news ORDER BY accessed_at DESC LIMIT ?)""", (self.max_entries,))
@@ -0,0 +1,61 @@
+import queue
+import threading
+import metrics
+
+# --- 設定區 ---
+NEWS_WORKERS = 4  # 同時查新聞的執行緒數
+
+class NewsWorkerPool:
+    """新聞查詢的生產者/消費者佇列：掃描端 submit() 股票名稱後馬上繼續抓報價，
+    背景執行緒負責查新聞，最後 drain() 等全部查完再取結果"""
+
+    def __init__(self, lookup, workers=NEWS_WORKERS):
+        self.lookup = lookup # 例如 news_scanner.scan_news，回傳 (標題, 分數, 備註)
+        self.workers = workers
+        self.queue = queue.Queue()
+        self.results = {}
+        self.submitted = set()
+        self.threads = []
+
+    def start(self):
+        if self.threads:
+            return self
+        for _ in range(self.workers):
+            t = threading.Thread(target=self._work, daemon=True)
+            t.start()
+            self.threads.append(t)
+        return self
+
+    def submit(self, name):
+        """排入查詢 (同一檔只查一次)"""
+        if name in self.submitted:
+            return
+        self.submitted.add(name)
+        self.start()
+        self.queue.put(name)
+
+    def _work(self):
+        while True:
+            name = self.queue.get()
+            try:
+                if name is None:
+                    return
+                try:
+                    with metrics.timer('news.lookup'):
+                        self.results[name] = self.lookup(name)
+                except Exception:
+                    self.results[name] = ("讀取失敗", 0, "N/A")
+            finally:
+                self.queue.task_done()
+
+    def drain(self):
+        """等所有排入的查詢完成，收掉執行緒，回傳 {名稱: (標題, 分數, 備註)}"""
+        self.queue.join()
+        for _ in self.threads:
+            self.queue.put(None)
+        for t in self.threads:
+            t.join()
+        self.threads = []
+        # 清空狀態，下一輪掃描可以重新使用
+        results, self.results, self.submitted = self.results, {}, set()
+        return results
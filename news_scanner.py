@@ -0,0 +1,59 @@
+import threading
+import requests
+from bs4 import BeautifulSoup
+import metrics
+from news_cache import NewsCache
+from sentiment import default_scorer
+
+# --- 設定區 ---
+NEWS_URL = "https://news.google.com/rss/search"
+TIMEOUT = 3            # 加快 timeout
+USE_NEWS_CACHE = True  # 新聞查詢結果存在 news_cache.sqlite，短時間內重複掃描不用再連網
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def fetch_titles(query, etag=None, last_modified=None):
+    """抓 Google News RSS，回傳 (標題列表, ETag, Last-Modified)；
+    伺服器回 304 (內容沒變) 時標題列表為 None"""
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    metrics.count('requests_total', source='google_news')
+    resp = requests.get(NEWS_URL, timeout=TIMEOUT, headers=headers,
+                        params={'q': query, 'hl': 'zh-TW', 'gl': 'TW', 'ceid': 'TW:zh-Hant'})
+    if resp.status_code == 304:
+        metrics.count('news_not_modified_total')
+        return None, etag, last_modified
+    resp.raise_for_status()
+
+    soup = BeautifulSoup(resp.content, features="xml")
+    titles = [item.title.text for item in soup.find_all('item')]
+    return titles, resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+
+def score_titles(titles):
+    """所有標題一起評分 (不再只看前 3 則)，回傳 (最新標題, 分數, AI 備註)
+    關鍵字與權重設定在 news_lexicon.json"""
+    return default_scorer().score_titles(titles)
+
+def get_cache():
+    global _cache
+    with _cache_lock: # 多條新聞執行緒可能同時第一次呼叫
+        if _cache is None:
+            _cache = NewsCache()
+    return _cache
+
+def scan_news(stock_name):
+    """搜尋 Google News，回傳 (最新標題, 分數, AI 備註)"""
+    try:
+        query = f"{stock_name}"
+        if USE_NEWS_CACHE:
+            return tuple(get_cache().lookup(query, fetch_titles, score_titles, default_scorer().version))
+        titles, _, _ = fetch_titles(query)
+        return score_titles(titles)
+    except Exception:
+        metrics.count('errors_total', source='google_news', kind='lookup')
+        return "讀取失敗", 0, "N/A"
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import datetime
+import argparse
+import realtime_pipeline
+import history_store
+import metrics
+from market_snapshot import parse_prices, is_throttled, is_bad_first_item
+from monitor import in_market_hours, wait_for_market
+from reference_table import ReferenceTable, CSV_FILE
+from sniper_v1 import MY_INVENTORY, send_line_notify
+
+# --- 設定區 ---
+PORTFOLIO_FILE = 'portfolio.json'  # 持股與買入後最高價 (第一次執行時由 sniper_v1.MY_INVENTORY 建立，之後直接改這個檔)
+SCAN_EVERY = 30                    # 每幾秒查一次報價
+DRAWDOWN = 0.05                    # 從買入後最高價回落超過 5% 發出警告 (移動停利)
+
+NEW_HIGH = "🚀 創新高"
+PULLBACK = "⚠️ 回檔警告"
+
+def load_holdings(path=PORTFOLIO_FILE):
+    """讀取持股 {代號: {'cost': 成本, 'highest': 買入後最高價}}，沒有檔案就用 sniper_v1 的庫存清單"""
+    if not os.path.exists(path):
+        return {code: dict(data) for code, data in MY_INVENTORY.items()}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_holdings(holdings, path=PORTFOLIO_FILE):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(holdings, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+def load_high_200(codes, path=CSV_FILE):
+    """每檔的 200 日高點：優先用 stock_db.csv，沒有的話用本地歷史資料庫"""
+    highs = {}
+    if os.path.exists(path):
+        ref = ReferenceTable.from_csv(path)
+        highs.update((code, float(ref.high_200[ref.index[code]])) for code in codes if code in ref)
+    for code in codes:
+        if code not in highs:
+            closes = history_store.get_closes(code, 200)
+            if closes is not None and len(closes) > 0:
+                highs[code] = float(closes.max())
+    return highs
+
+class PortfolioMonitor:
+    """持股監控 (sniper_v1 的策略 B、C)：
+    - 買入後最高價隨報價更新並寫回 PORTFOLIO_FILE，重開程式也接得上
+    - 每種警示只在「剛成立」時通知一次，條件解除後才會再通知"""
+
+    def __init__(self, holdings, high_200=None, drawdown=DRAWDOWN, path=PORTFOLIO_FILE):
+        self.holdings = holdings
+        self.high_200 = high_200 or {}
+        self.drawdown = drawdown
+        self.path = path
+        self.active = set() # 目前成立中的 (代號, 警示)
+
+    def update(self, quotes):
+        """quotes 為 {代號: 現價}，回傳這一輪新成立的警示 [(代號, 警示, 訊息), ...]"""
+        alerts, changed = [], False
+        for code, data in self.holdings.items():
+            price = quotes.get(code)
+            if price is None:
+                continue
+
+            # 更新買入後的最高價紀錄
+            if price > data['highest']:
+                data['highest'] = price
+                changed = True
+
+            drawdown = (data['highest'] - price) / data['highest']
+            rules = {
+                NEW_HIGH: (code in self.high_200 and price >= self.high_200[code],
+                           f"現價: {price}\n買入價: {data['cost']}\n建議: 續抱或設定停利"),
+                PULLBACK: (drawdown > self.drawdown,
+                           f"現價: {price}\n波段最高: {data['highest']}\n回檔幅度: {drawdown*100:.1f}%\n建議: 檢查是否獲利了結"),
+            }
+            for rule, (hit, detail) in rules.items():
+                key = (code, rule)
+                if not hit:
+                    self.active.discard(key)
+                elif key not in self.active:
+                    self.active.add(key)
+                    alerts.append((code, rule, f"\n{rule}: {code}\n{detail}"))
+
+        if changed:
+            save_holdings(self.holdings, self.path)
+        return alerts
+
+def fetch_quotes(codes):
+    """所有持股一次查詢 (一個請求)，被擋或失敗時回傳空的
+    某檔缺 tlong 時 twstock 整批回傳 rtcode 5002：拆成兩半各自重查，最後只跳過壞掉的那檔"""
+    metrics.count('requests_total', source='twse_realtime')
+    try:
+        with metrics.timer('scan.request'):
+            data = realtime_pipeline.get_quotes(codes)
+    except Exception as e:
+        print(f"⚠️ 報價查詢失敗: {e}")
+        data = None
+    if is_throttled(data):
+        metrics.count('errors_total', source='twse_realtime', kind='throttled')
+        return {}
+    if is_bad_first_item(data):
+        metrics.count('errors_total', source='twse_realtime', kind='tlong')
+        if len(codes) == 1:
+            print(f"\n⚠️ {codes[0]} 跳過 (資料格式錯誤)")
+            return {}
+        half = len(codes) // 2
+        return {**fetch_quotes(codes[:half]), **fetch_quotes(codes[half:])}
+    return parse_prices(data, codes)
+
+def run_portfolio_monitor(interval=SCAN_EVERY, ignore_hours=False, once=False, path=PORTFOLIO_FILE):
+    holdings = load_holdings(path)
+    if not holdings:
+        print(f"❌ {path} 裡沒有持股")
+        return
+    if not os.path.exists(path):
+        save_holdings(holdings, path)
+        print(f"📝 已由 sniper_v1.MY_INVENTORY 建立 {path}，之後增減持股請直接修改這個檔案")
+
+    print(f"💼 持股監控啟動：{len(holdings)} 檔，每 {interval} 秒查一次 (Ctrl-C 結束)")
+
+    session = None
+    try:
+        while True:
+            if not once and not ignore_hours and not in_market_hours():
+                wait_for_market()
+                continue
+            if session != datetime.date.today():
+                # 新的交易日：重讀持股檔 (可能手動改過) 與 200 日高點 (data_builder 收盤後會更新)
+                session = datetime.date.today()
+                holdings = load_holdings(path)
+                codes = list(holdings)
+                monitor = PortfolioMonitor(holdings, load_high_200(codes), path=path)
+
+            started = time.monotonic()
+            quotes = fetch_quotes(codes)
+            for code, rule, msg in monitor.update(quotes):
+                send_line_notify(msg)
+            print(f"[{datetime.datetime.now().strftime('%H:%M:%S')}] 💼 {len(quotes)}/{len(codes)} 檔有報價，"
+                  f"成立中的警示 {len(monitor.active)} 個", end="\r")
+            if once:
+                break
+
+            metrics.write()
+            metrics.sleep(max(0, interval - (time.monotonic() - started)), 'interval')
+    except KeyboardInterrupt:
+        pass
+    print("\n👋 持股監控結束")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="StockSniper 持股監控：盤中持續檢查創新高與移動停利回檔")
+    parser.add_argument('--interval', type=int, default=SCAN_EVERY, help="每幾秒查一次報價")
+    parser.add_argument('--file', default=PORTFOLIO_FILE, help="持股與最高價紀錄檔")
+    parser.add_argument('--once', action='store_true', help="只檢查一次就結束")
+    parser.add_argument('--ignore-hours', action='store_true', help="不管開盤時間，一直查 (測試用)")
+    parser.add_argument('--metrics', action='store_true',
+                        help=f"每輪輸出耗時與請求統計到 {metrics.METRICS_DIR}/ (Prometheus 文字格式 + JSON)")
+    args = parser.parse_args()
+    metrics.setup('portfolio_monitor', args.metrics or None)
+    run_portfolio_monitor(args.interval, ignore_hours=args.ignore_hours, once=args.once, path=args.file)
@@ -0,0 +1,128 @@
+import json
+import time
+import sqlite3
+import threading
+import argparse
+import metrics
+from market_snapshot import is_throttled
+
+# --- 設定區 ---
+CACHE_FILE = 'quote_cache.sqlite'  # 所有掃描程式共用同一個檔案
+QUOTE_TTL = 20                     # 報價幾秒內算新鮮 (不再向證交所查)
+
+class QuoteCache:
+    """跨程式共用的即時報價快取 (SQLite)。
+    用法與 twstock.realtime.get(list) 相同：cache(batch) 只會把過期的代號合成一次向上游查詢，
+    命中/未命中次數同時記在本程式與資料庫裡 (可看出省下多少請求)"""
+
+    def __init__(self, fetch_fn, path=CACHE_FILE, ttl=QUOTE_TTL):
+        self.fetch_fn = fetch_fn
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.upstream_requests = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS quotes (code TEXT PRIMARY KEY, payload TEXT, fetched_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+            conn.executemany("INSERT OR IGNORE INTO stats VALUES (?, 0)",
+                             [('hits',), ('misses',), ('upstream_requests',)])
+
+    def _count(self, hits=0, misses=0, upstream=0):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.upstream_requests += upstream
+        conn = self._conn()
+        with conn:
+            conn.executemany("UPDATE stats SET value = value + ? WHERE name = ?",
+                             [(hits, 'hits'), (misses, 'misses'), (upstream, 'upstream_requests')])
+
+    def split(self, codes):
+        """把代號分成 (新鮮的快取資料 {code: payload}, 需要重抓的代號列表)"""
+        codes = list(codes)
+        fresh = {}
+        conn = self._conn()
+        cutoff = time.time() - self.ttl
+        # SQLite 參數數量有上限，分段查
+        for i in range(0, len(codes), 500):
+            chunk = codes[i : i + 500]
+            rows = conn.execute(
+                f"SELECT code, payload FROM quotes WHERE fetched_at >= ? AND code IN ({','.join('?' * len(chunk))})",
+                [cutoff, *chunk])
+            fresh.update((code, json.loads(payload)) for code, payload in rows)
+        stale = [c for c in codes if c not in fresh]
+        self._count(hits=len(fresh), misses=len(stale))
+        metrics.count('quote_cache_total', len(fresh), result='hit')
+        metrics.count('quote_cache_total', len(stale), result='miss')
+        return fresh, stale
+
+    def store(self, realtime_data, codes):
+        now = time.time()
+        rows = [(c, json.dumps(realtime_data[c], ensure_ascii=False), now)
+                for c in codes if c in realtime_data and realtime_data[c].get('success')]
+        conn = self._conn()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO quotes VALUES (?, ?, ?)", rows)
+
+    def refresh(self, stale):
+        """已知過期的代號：合成一次向上游查詢並寫回快取 (回傳格式同 twstock.realtime.get)"""
+        data = self.fetch_fn(stale)
+        self._count(upstream=1)
+        if not is_throttled(data): # 被擋就原樣交給呼叫端處理退避
+            self.store(data, stale)
+        return data
+
+    def get(self, batch):
+        fresh, stale = self.split(batch)
+        result = {'success': True}
+        result.update(fresh)
+        if stale:
+            data = self.refresh(stale)
+            if is_throttled(data):
+                return data
+            result.update({c: data[c] for c in stale if c in data})
+        return result
+
+    __call__ = get
+
+    def stats(self):
+        """資料庫裡累計的命中統計 (所有程式加總)"""
+        totals = dict(self._conn().execute("SELECT name, value FROM stats"))
+        lookups = totals.get('hits', 0) + totals.get('misses', 0)
+        totals['hit_rate'] = round(totals.get('hits', 0) / lookups, 3) if lookups else 0.0
+        return totals
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0
+        return (f"報價快取：命中 {self.hits} / 未命中 {self.misses} ({rate:.0f}%)，"
+                f"向證交所查詢 {self.upstream_requests} 次")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="查看 / 清除共用報價快取")
+    parser.add_argument('--clear', action='store_true', help="清空快取與統計")
+    args = parser.parse_args()
+
+    cache = QuoteCache(fetch_fn=None)
+    if args.clear:
+        with cache._conn() as conn:
+            conn.execute("DELETE FROM quotes")
+            conn.execute("UPDATE stats SET value = 0")
+        print("🧹 已清空報價快取")
+    for name, value in cache.stats().items():
+        print(f"{name:<18} {value}")
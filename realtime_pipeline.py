@@ -0,0 +1,160 @@
+import asyncio
+import datetime
+import threading
+import time
+import requests
+import twstock
+import metrics
+from market_snapshot import MarketSnapshot, parse_prices, is_throttled, is_bad_first_item
+
+# --- 設定區 ---
+QUOTE_HOST = 'https://mis.twse.com.tw'  # 測試時可用 use_quote_server() 指到本機假伺服器
+SESSION_PATH = '/stock/index.jsp'
+STOCKINFO_PATH = '/stock/api/getStockInfo.jsp'
+TIMEOUT = 5
+BATCH_SIZE = 40      # 每個請求查幾檔 (上市 + 上櫃約 1800 檔，請求數與原本只掃上市 20 檔一批差不多)
+MAX_IN_FLIGHT = 4    # 同時最多幾個請求在路上
+MAX_RPS = 3.0        # 每秒請求上限 (所有請求共用)
+RETRIES = 3          # 單一批次被擋/失敗最多重試幾次
+BACKOFF = 2.0        # 第一次重試前等幾秒 (之後加倍)
+
+_local = threading.local()
+
+def use_quote_server(host):
+    """把報價來源改成 host (例如 'http://127.0.0.1:8081')，用於本機假伺服器測試"""
+    global QUOTE_HOST
+    QUOTE_HOST = host.rstrip('/')
+
+def _session():
+    """每條執行緒一個 session，只在第一次取得 cookie (twstock 每次查詢都會重新連一次首頁)"""
+    session = getattr(_local, 'session', None)
+    if session is None or _local.host != QUOTE_HOST:
+        session = requests.Session()
+        session.get(QUOTE_HOST + SESSION_PATH, timeout=TIMEOUT)
+        _local.session, _local.host = session, QUOTE_HOST
+    return session
+
+def _channel(code):
+    return f"{'tse' if code in twstock.twse else 'otc'}_{code}.tw"
+
+def get_raw_quotes(batch):
+    """查詢一批即時報價，回傳證交所原始 JSON (JSON 解析失敗時回傳 None)"""
+    r = _session().get(QUOTE_HOST + STOCKINFO_PATH, timeout=TIMEOUT, params={
+        'ex_ch': '|'.join(_channel(c) for c in batch),
+        'json': 1,
+        'delay': 0,
+        '_': int(time.time() * 1000),
+    })
+    try:
+        return r.json()
+    except ValueError:
+        return None
+
+def format_quotes(raw):
+    """證交所原始 JSON -> 與 twstock.realtime.get(list) 相同格式
+    (只取掃描用得到的欄位，單檔缺欄位也不會讓整批失敗)"""
+    if raw is None:
+        return {'success': False, 'rtcode': '5000', 'rtmessage': 'json decode error'}
+
+    result = {'success': True}
+    for item in raw.get('msgArray', []):
+        result[item['c']] = {
+            'success': True,
+            'info': {'code': item['c'], 'name': item.get('n')},
+            'realtime': {
+                'latest_trade_price': item.get('z'),
+                'open': item.get('o'),
+                'high': item.get('h'),
+                'low': item.get('l'),
+                'accumulate_trade_volume': item.get('v'),
+            },
+        }
+    return result
+
+def get_quotes(batch):
+    """查詢一批即時報價，回傳格式與 twstock.realtime.get(list) 相同"""
+    return format_quotes(get_raw_quotes(batch))
+
+class AsyncRateLimiter:
+    """asyncio 版的限速器：請求之間至少間隔 1/rate 秒"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_time = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            now = asyncio.get_running_loop().time()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait > 0:
+            metrics.record_sleep(wait, 'rate_limit')
+            await asyncio.sleep(wait)
+
+async def fetch_snapshot_async(codes, batch_size=BATCH_SIZE, max_in_flight=MAX_IN_FLIGHT,
+                               max_rps=MAX_RPS, quote_fn=None, on_batch=None):
+    """同時保持最多 max_in_flight 個報價請求，回來一批就解析一批，最後組成完整的市場快照
+    on_batch(quotes) 會在每批解析完後呼叫"""
+    quote_fn = quote_fn or get_quotes
+    limiter = AsyncRateLimiter(max_rps)
+    in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def fetch_batch(batch):
+        delay = BACKOFF
+        for attempt in range(RETRIES + 1):
+            bad_item = False
+            async with in_flight:
+                await limiter.acquire()
+                metrics.count('requests_total', source='twse_realtime')
+                try:
+                    with metrics.timer('scan.request'):
+                        data = await asyncio.to_thread(quote_fn, batch)
+                except Exception as e:
+                    bad_item = "tlong" in str(e)
+                    data = None
+                else:
+                    bad_item = is_bad_first_item(data) # 壞掉的那檔排在第一個 (rtcode 5002)
+            # twstock 遇到某檔缺 tlong 會整批失敗：先釋放名額再拆成兩半各自重抓
+            # (在 in_flight 裡面遞迴，每一層都佔著名額等下一層，名額用完就卡死)
+            if bad_item:
+                metrics.count('errors_total', source='twse_realtime', kind='tlong')
+                if len(batch) == 1:
+                    print(f"\n⚠️ {batch[0]} 跳過 (資料格式錯誤)")
+                    return [(batch, None)]
+                half = len(batch) // 2
+                parts = await asyncio.gather(fetch_batch(batch[:half]), fetch_batch(batch[half:]))
+                return [item for part in parts for item in part]
+            if not is_throttled(data):
+                return [(batch, data)]
+            metrics.count('errors_total', source='twse_realtime', kind='throttled')
+            if attempt < RETRIES:
+                metrics.count('retries_total', source='twse_realtime')
+                metrics.record_sleep(delay, 'backoff')
+                await asyncio.sleep(delay)
+                delay *= 2
+        return [(batch, None)]
+
+    snapshot = MarketSnapshot()
+    quotes = {}
+    batches = [codes[i : i + batch_size] for i in range(0, len(codes), batch_size)]
+    for done, task in enumerate(asyncio.as_completed([fetch_batch(b) for b in batches]), 1):
+        for batch, data in await task:
+            if data is None:
+                snapshot.skipped.extend(batch)
+            else:
+                parsed = parse_prices(data, batch)
+                quotes.update(parsed)
+                if on_batch:
+                    on_batch(parsed)
+        print(f"📡 抓取報價 [{done}/{len(batches)} 批]...", end="\r")
+    print()
+
+    # 依原本代號順序排好，報表順序才會固定
+    snapshot.quotes = {c: quotes[c] for c in codes if c in quotes}
+    snapshot.taken_at = datetime.datetime.now()
+    return snapshot
+
+def fetch_snapshot_concurrent(codes, **kwargs):
+    """同步呼叫用的包裝 (參數同 fetch_snapshot_async)"""
+    return asyncio.run(fetch_snapshot_async(list(codes), **kwargs))
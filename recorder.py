@@ -0,0 +1,85 @@
+import os
+import json
+import time
+import argparse
+import datetime
+import requests
+import realtime_pipeline
+import news_scanner
+from scan_engine import load_reference
+from fake_servers import RECORDINGS_DIR, news_key
+
+# --- 設定區 ---
+BATCH_SIZE = 20     # 每個請求查幾檔
+BATCH_SLEEP = 3     # 每批之間休息幾秒 (錄製只跑一次，慢一點沒關係)
+NEWS_SLEEP = 0.5
+
+def record_quotes(codes, batch_size=BATCH_SIZE, sleep=BATCH_SLEEP):
+    """錄下證交所原始 msgArray，回傳 {code: 原始項目}"""
+    items = {}
+    for i in range(0, len(codes), batch_size):
+        batch = codes[i : i + batch_size]
+        try:
+            raw = realtime_pipeline.get_raw_quotes(batch)
+        except Exception as e:
+            print(f"⚠️ 批次 {i // batch_size + 1} 失敗: {e}")
+            continue
+        if raw is None:
+            print(f"⚠️ 批次 {i // batch_size + 1} 回傳非 JSON，略過")
+            continue
+        for item in raw.get('msgArray', []):
+            items[item['c']] = item
+        print(f"📡 報價 {min(i + batch_size, len(codes))}/{len(codes)}", end='\r')
+        time.sleep(sleep)
+    print()
+    return items
+
+def record_news(queries, sleep=NEWS_SLEEP):
+    """錄下 Google News RSS 原始內容，回傳 {query: RSS bytes}"""
+    pages = {}
+    for n, query in enumerate(queries, 1):
+        try:
+            resp = requests.get(news_scanner.NEWS_URL, timeout=news_scanner.TIMEOUT,
+                                params={'q': query, 'hl': 'zh-TW', 'gl': 'TW', 'ceid': 'TW:zh-Hant'})
+            resp.raise_for_status()
+            pages[query] = resp.content
+        except Exception as e:
+            print(f"⚠️ 新聞 {query} 失敗: {e}")
+        print(f"📰 新聞 {n}/{len(queries)}", end='\r')
+        time.sleep(sleep)
+    print()
+    return pages
+
+def save_recording(name, quotes, news, root=RECORDINGS_DIR):
+    """存成 recordings/<name>/quotes.json 與 news/<md5>.xml (index.json 對照查詢字串)"""
+    folder = os.path.join(root, name)
+    os.makedirs(os.path.join(folder, 'news'), exist_ok=True)
+    with open(os.path.join(folder, 'quotes.json'), 'w', encoding='utf-8') as f:
+        json.dump(quotes, f, ensure_ascii=False)
+    index = {}
+    for query, body in news.items():
+        key = news_key(query)
+        index[key] = query
+        with open(os.path.join(folder, 'news', key + '.xml'), 'wb') as f:
+            f.write(body)
+    with open(os.path.join(folder, 'news', 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    return folder
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="錄製即時報價與新聞 RSS，供 fake_servers.py 離線重播")
+    parser.add_argument('--name', default=datetime.datetime.now().strftime('%Y%m%d_%H%M'), help="錄製名稱")
+    parser.add_argument('--codes', type=int, default=0, help="只錄前 N 檔 (0 = 資料庫全部)")
+    parser.add_argument('--news', type=int, default=0, help="順便錄前 N 檔的新聞")
+    args = parser.parse_args()
+
+    ref = load_reference()
+    if ref is None:
+        raise SystemExit(1)
+    codes = list(ref.codes[: args.codes] if args.codes else ref.codes)
+
+    quotes = record_quotes(codes)
+    news = record_news([ref.record(c)['name'] for c in codes[: args.news]]) if args.news else {}
+    folder = save_recording(args.name, quotes, news)
+    print(f"📼 已錄製 {len(quotes)} 檔報價、{len(news)} 則新聞查詢 -> {folder}")
+    print(f"   重播: python fake_servers.py {args.name}")
@@ -0,0 +1,89 @@
+import os
+import datetime
+import numpy as np
+import pandas as pd
+import technicals
+
+# --- 設定區 ---
+CSV_FILE = 'stock_db.csv'
+TRAILING_DAYS = 20   # data_builder 另存每檔最近 20 根收盤價 (stock_db_closes.npz)，盤中算即時 MA5/MA20
+LIVE_MA = (5, 20)
+MARKET_NAMES = {'twse': '上市', 'tpex': '上櫃'}
+
+def closes_path(csv_path=CSV_FILE):
+    """stock_db.csv 旁邊的近期收盤價檔"""
+    return os.path.splitext(csv_path)[0] + '_closes.npz'
+
+def save_closes(codes, closes, csv_path=CSV_FILE):
+    """存 [代號 x 最近 TRAILING_DAYS 根收盤價] (舊到新，不足的補 NaN)"""
+    path = closes_path(csv_path)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, codes=np.asarray(codes, dtype=str), closes=np.asarray(closes, dtype=float))
+    os.replace(tmp_path, path)
+
+class ReferenceTable:
+    """stock_db.csv 的陣列版：代號 -> 列號用 dict 查 (O(1))，
+    數值欄位都是 NumPy 陣列，一整批報價可以一次算完"""
+
+    def __init__(self, df):
+        df = df.reset_index(drop=True)
+        self.df = df
+        self.codes = df['code'].astype(str).to_numpy()
+        self.names = df['name'].astype(str).to_numpy()
+        # 市場 (twse 上市 / tpex 上櫃)；舊版 stock_db.csv 沒有這欄，當時只有上市股
+        self.markets = df['market'].astype(str).to_numpy() if 'market' in df.columns else np.full(len(df), 'twse')
+        self.low_200 = df['low_200'].to_numpy(dtype=float)
+        self.high_200 = df['high_200'].to_numpy(dtype=float)
+        self.ma5_ref = df['ma5_ref'].to_numpy(dtype=float)
+        self.ma20_ref = df['ma20_ref'].to_numpy(dtype=float)
+        # 建檔時預先算好的技術指標 (ref.rsi14、ref.k9...)，舊版 stock_db.csv 沒有這些欄位時全是 NaN
+        for col in technicals.COLUMNS:
+            setattr(self, col, df[col].to_numpy(dtype=float) if col in df.columns else np.full(len(df), np.nan))
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.prior_sums = None # {n: 前 n-1 天收盤價總和}，有近期收盤價時才有
+
+    @classmethod
+    def from_csv(cls, path=CSV_FILE):
+        # 確保 code 欄位是字串
+        ref = cls(pd.read_csv(path, dtype={'code': str}))
+        if os.path.exists(closes_path(path)):
+            with np.load(closes_path(path)) as data:
+                ref.attach_closes(data['codes'], data['closes'])
+        return ref
+
+    def attach_closes(self, codes, closes, today=None):
+        """載入近期收盤價，先把每檔「前 n-1 天的收盤總和」算好，盤中每批報價只剩一次加法與除法
+        建檔時已經有今天的日 K (收盤後才建檔) 的股票，今天那根由盤中價取代"""
+        window = np.full((len(self), TRAILING_DAYS), np.nan)
+        rows = self.rows([str(c) for c in codes])
+        found = rows >= 0
+        window[rows[found]] = np.asarray(closes, dtype=float)[found]
+
+        today = str(today or datetime.date.today())
+        same_day = (self.df['last_update'].astype(str).to_numpy() == today)[:, None]
+        prior = np.where(same_day, window[:, :-1], window[:, 1:]) # 今天之前的最近 TRAILING_DAYS-1 根
+        self.prior_sums = {n: prior[:, prior.shape[1] - (n - 1):].sum(axis=1) for n in LIVE_MA}
+
+    def live_ma(self, n, rows, prices):
+        """盤中即時 MAn = (前 n-1 天收盤 + 現價) / n，一整批一次算
+        沒有近期收盤價 (舊版資料庫或上市未滿 n 天) 的股票沿用昨天的 ma{n}_ref"""
+        ref = getattr(self, f'ma{n}_ref')[rows]
+        if self.prior_sums is None:
+            return ref
+        live = (self.prior_sums[n][rows] + prices) / n
+        return np.where(np.isnan(live), ref, live)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self.index
+
+    def rows(self, codes):
+        """一批代號 -> 列號陣列 (找不到的是 -1)"""
+        return np.fromiter((self.index.get(c, -1) for c in codes), dtype=np.intp, count=len(codes))
+
+    def record(self, code):
+        """單檔資料 (取代 df[df['code'] == code].iloc[0])"""
+        return self.df.iloc[self.index[code]]
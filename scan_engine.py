@@ -0,0 +1,238 @@
+import datetime
+import random
+import argparse
+from collections import deque
+import pandas as pd
+import twstock
+from reference_table import ReferenceTable
+from market_snapshot import MarketSnapshot, parse_prices, is_throttled, is_bad_first_item
+from batch_controller import AdaptiveBatchController, state_path
+import realtime_pipeline
+import metrics
+import signal_archive
+from quote_cache import QuoteCache
+
+# --- 設定區 ---
+CSV_FILE = 'stock_db.csv'
+BATCH_SIZE = 16           # 每次向證交所查詢幾檔 (上市 + 上櫃約 1800 檔，與原本只掃上市 8 檔一批的請求數相當)
+BATCH_SLEEP = (1.5, 3)    # 批次間隨機休息秒數
+COOLDOWN = 60             # 被擋 IP 時的冷卻秒數
+THROTTLE_PAUSE = 3        # 被限流 (空回應) 或批次失敗後至少休息幾秒
+MAX_RETRIES = 3           # 同一批被擋/斷線最多重抓幾次，之後跳過 (上游一直擋時掃描才會結束)
+USE_QUOTE_CACHE = True    # 透過共用報價快取讀取 (多個程式同時掃描時不重複向證交所查詢)
+
+def fetch_snapshot(codes, batch_size=BATCH_SIZE, sleep_range=BATCH_SLEEP, quote_fn=None, controller=None,
+                   on_batch=None, throttle_pause=THROTTLE_PAUSE):
+    """分批抓取即時報價，組成一份市場快照 (每檔只抓一次，所有策略共用)
+    有給 controller (AdaptiveBatchController) 時，批次大小與間隔由它動態調整
+    on_batch(quotes) 會在每批報價解析完後馬上被呼叫 (讓策略可以邊抓邊處理)"""
+    quote_fn = quote_fn or twstock.realtime.get
+    snapshot = MarketSnapshot()
+    total = len(codes)
+    pending = deque() # 要重抓的 (批次, 已重試次數)：被擋後重試、格式錯誤時對半拆開
+
+    i = 0
+    while i < total or pending:
+        if pending:
+            batch, attempts = pending.popleft()
+        else:
+            size = controller.batch_size if controller else batch_size
+            batch, attempts = codes[i : i + size], 0
+            i += len(batch)
+        print(f"📡 抓取報價 [{i}/{total}]...", end="\r")
+        try:
+            metrics.count('requests_total', source='twse_realtime')
+            with metrics.timer('scan.request'):
+                realtime_data = quote_fn(batch)
+            if is_throttled(realtime_data):
+                raise Exception("Empty Response")
+            if is_bad_first_item(realtime_data):
+                raise Exception("Invalid Stock ID (tlong)") # 壞掉的那檔排在第一個，同樣拆開重抓
+
+            quotes = parse_prices(realtime_data, batch)
+            snapshot.quotes.update(quotes)
+            if on_batch:
+                on_batch(quotes)
+            if controller:
+                controller.on_success()
+                metrics.sleep(controller.next_delay(), 'batch_delay')
+            else:
+                metrics.sleep(random.uniform(*sleep_range), 'batch_delay')
+
+        except Exception as e:
+            err_msg = str(e)
+            if "tlong" in err_msg: # 某檔資料格式錯誤 (例如 8081) 會讓整批失敗
+                metrics.count('errors_total', source='twse_realtime', kind='tlong')
+                if len(batch) > 1:
+                    half = len(batch) // 2
+                    # 拆成兩半重抓，找出壞掉的那檔 (不算重試)
+                    pending.extendleft([(batch[half:], attempts), (batch[:half], attempts)])
+                else:
+                    print(f"\n⚠️ {batch[0]} 跳過 (資料格式錯誤)")
+                    snapshot.skipped.extend(batch)
+                continue
+
+            if controller:
+                controller.on_failure()
+            disconnected = "Connection" in err_msg or "RemoteDisconnected" in err_msg
+            throttled = err_msg == "Empty Response"
+            retryable = attempts < MAX_RETRIES
+            if disconnected and retryable:
+                metrics.count('errors_total', source='twse_realtime', kind='connection')
+                metrics.count('retries_total', source='twse_realtime')
+                print(f"\n🛑 IP 冷卻中... ({COOLDOWN}s)")
+                metrics.sleep(COOLDOWN, 'ip_cooldown')
+                print("▶️ 恢復...")
+                pending.appendleft((batch, attempts + 1)) # 同一批重抓
+            elif controller and throttled and retryable:
+                # 被限流：批次已經縮小，拆成新的大小重抓
+                metrics.count('errors_total', source='twse_realtime', kind='throttled')
+                metrics.count('retries_total', source='twse_realtime')
+                size = controller.batch_size
+                pending.extendleft(reversed([(batch[j : j + size], attempts + 1) for j in range(0, len(batch), size)]))
+                metrics.sleep(max(throttle_pause, controller.next_delay()), 'throttle')
+            else:
+                metrics.count('errors_total', source='twse_realtime',
+                              kind='throttled' if throttled else 'connection' if disconnected else 'unknown')
+                if retryable:
+                    print(f"\n⚠️ 未知錯誤: {err_msg}，跳過此批...")
+                else:
+                    print(f"\n⚠️ 重抓 {MAX_RETRIES} 次仍失敗 ({err_msg})，跳過此批...")
+                snapshot.skipped.extend(batch)
+                metrics.sleep(throttle_pause, 'error_pause')
+
+    if controller:
+        controller.save()
+    snapshot.taken_at = datetime.datetime.now()
+    print()
+    return snapshot
+
+class Strategy:
+    """策略基底類別：拿到市場快照後產生訊號列表，並各自輸出報表"""
+    name = "strategy"
+    report_file = None
+
+    def on_quotes(self, quotes, ref):
+        """抓報價途中每批報價到手時呼叫，可以先把耗時的工作 (例如查新聞) 排進背景"""
+
+    def evaluate(self, snapshot, ref):
+        """拿到完整快照後，回傳要寫入報表的資料列 (list of dict)"""
+        raise NotImplementedError
+
+    def write_report(self, rows):
+        if not self.report_file:
+            return
+        if rows:
+            pd.DataFrame(rows).to_csv(self.report_file, index=False, encoding='utf-8-sig')
+            print(f"✅ [{self.name}] 已發現 {len(rows)} 檔機會，報表已儲存為: {self.report_file}")
+            try:
+                # 順便匯入訊號歷史資料庫 (失敗也不影響報表，之後執行 signal_archive.py 會補匯入)
+                signal_archive.SignalArchive().ingest_report(self.report_file)
+            except Exception as e:
+                print(f"⚠️ 訊號歷史匯入失敗: {e}")
+        else:
+            print(f"[{self.name}] 今天很平靜，沒有發現符合條件的股票。")
+
+    def run(self, snapshot, ref):
+        with metrics.timer(f"{self.name}.evaluate"):
+            rows = self.evaluate(snapshot, ref)
+        with metrics.timer(f"{self.name}.report"):
+            self.write_report(rows)
+        return rows
+
+class ScanEngine:
+    """抓一次市場快照，交給所有註冊的策略各自判斷"""
+
+    def __init__(self, ref, batch_size=BATCH_SIZE, sleep_range=BATCH_SLEEP, quote_fn=None, adaptive=True,
+                 async_fetch=False, max_rps=None, throttle_pause=THROTTLE_PAUSE, name=None):
+        self.ref = ref
+        self.async_fetch = async_fetch # True: 改用 asyncio 併發抓取 (realtime_pipeline)
+        self.max_rps = max_rps or realtime_pipeline.MAX_RPS # async 抓取的每秒請求上限 (分片掃描時每個分片各自一份)
+        self.batch_size = batch_size
+        self.sleep_range = sleep_range
+        self.throttle_pause = throttle_pause # 被擋時的退避 (與平常的批次間隔分開設定)
+        if quote_fn is None and USE_QUOTE_CACHE:
+            quote_fn = QuoteCache(fetch_fn=realtime_pipeline.get_quotes if async_fetch else twstock.realtime.get)
+        self.quote_fn = quote_fn
+        self.strategies = []
+        # adaptive: 批次大小/間隔自動調整，batch_size 與 sleep_range 只當作第一次的起點
+        # name: 呼叫的程式名稱，調整結果存在這個程式自己的檔案 (見 batch_controller.state_path)
+        self.controller = None
+        if adaptive:
+            self.controller = AdaptiveBatchController.load(batch_size, sum(sleep_range) / 2, state_path(name))
+
+    def register(self, strategy):
+        self.strategies.append(strategy)
+        return strategy
+
+    def _dispatch_quotes(self, quotes):
+        if quotes:
+            for strategy in self.strategies:
+                strategy.on_quotes(quotes, self.ref)
+
+    def fetch(self, codes):
+        """抓一份市場快照；有報價快取時，新鮮的直接用快取，只向上游查過期的代號"""
+        quote_fn, cached, fetch_codes = self.quote_fn, {}, codes
+        if isinstance(quote_fn, QuoteCache):
+            with metrics.timer('scan.cache_lookup'):
+                cached, fetch_codes = quote_fn.split(codes)
+            quote_fn = quote_fn.refresh
+            self._dispatch_quotes(parse_prices(cached, codes))
+
+        if not fetch_codes:
+            snapshot = MarketSnapshot()
+        elif self.async_fetch:
+            snapshot = realtime_pipeline.fetch_snapshot_concurrent(fetch_codes, quote_fn=quote_fn, max_rps=self.max_rps,
+                                                                   on_batch=self._dispatch_quotes)
+        else:
+            snapshot = fetch_snapshot(fetch_codes, self.batch_size, self.sleep_range, quote_fn, self.controller,
+                                      on_batch=self._dispatch_quotes, throttle_pause=self.throttle_pause)
+
+        if isinstance(self.quote_fn, QuoteCache):
+            quotes = parse_prices(cached, codes)
+            quotes.update(snapshot.quotes)
+            snapshot.quotes = {c: quotes[c] for c in codes if c in quotes}
+            print(self.quote_fn.summary())
+        return snapshot
+
+    def run(self, codes=None):
+        codes = self.ref.codes.tolist() if codes is None else list(codes)
+        with metrics.timer('scan.fetch'):
+            snapshot = self.fetch(codes)
+        print(f"[{snapshot.taken_at.strftime('%H:%M:%S')}] 📸 快照完成：{len(snapshot)} 檔有報價"
+              + (f"，{len(snapshot.skipped)} 檔抓取失敗" if snapshot.skipped else ""))
+
+        results = {}
+        for strategy in self.strategies:
+            results[strategy.name] = strategy.run(snapshot, self.ref)
+        return snapshot, results
+
+def load_reference(path=CSV_FILE):
+    try:
+        with metrics.timer('scan.load_reference'):
+            ref = ReferenceTable.from_csv(path)
+        print(f"📚 已載入資料庫，共 {len(ref)} 檔監控目標")
+        return ref
+    except FileNotFoundError:
+        print(f"❌ 找不到 {path}！請先執行 data_builder.py")
+        return None
+
+if __name__ == "__main__":
+    import strategies
+
+    parser = argparse.ArgumentParser(description="StockSniper 共用掃描引擎：抓一次報價，多個策略同時判斷")
+    parser.add_argument('-s', '--strategy', action='append', choices=sorted(strategies.REGISTRY),
+                        help="要執行的策略 (可重複指定，預設全部)")
+    parser.add_argument('--async', dest='async_fetch', action='store_true',
+                        help="用 asyncio 併發抓報價 (速率上限見 realtime_pipeline.MAX_RPS)")
+    parser.add_argument('--metrics', action='store_true',
+                        help=f"輸出各階段耗時與請求統計到 {metrics.METRICS_DIR}/ (Prometheus 文字格式 + JSON)")
+    args = parser.parse_args()
+
+    metrics.setup('scan_engine', args.metrics or None)
+    ref = load_reference()
+    if ref is not None:
+        engine = ScanEngine(ref, async_fetch=args.async_fetch, name='scan_engine')
+        for key in args.strategy or sorted(strategies.REGISTRY):
+            engine.register(strategies.REGISTRY[key]())
+        engine.run()
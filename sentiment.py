@@ -0,0 +1,94 @@
+import os
+import re
+import json
+import hashlib
+
+# --- 設定區 ---
+LEXICON_FILE = 'news_lexicon.json'  # 關鍵字、權重、否定詞都在這裡改，不用動程式
+
+# 找不到字典檔時的預設關鍵字 (原本 scan_news 裡的清單)
+DEFAULT_POSITIVE = ['營收', '創高', '大增', '買超', '旺季', '成長', '強勢', '填息', '獲利', '漲停', '法說']
+DEFAULT_NEGATIVE = ['虧損', '衰退', '賣超', '下修', '重挫', '跌停', '疲弱', '利空', '斬腰']
+
+class HeadlineScorer:
+    """新聞標題評分引擎：所有關鍵字編譯成一個正規表達式，每則標題只掃一次
+    - 每個關鍵字有自己的權重 (正面為正、負面為負)
+    - 關鍵字前 negation_window 個字內出現否定詞 (例如「未成長」「不再虧損」) 時分數反轉
+    - exemptions 裡的詞 (例如「不斷成長」「未來營收」) 雖然含否定字但不是否定，不會反轉
+    - 同一則標題裡同一個關鍵字只算一次 (與原本的計分方式相同)"""
+
+    def __init__(self, positive, negative, negations=(), negation_window=2, exemptions=()):
+        self.weights = {k: float(w) for k, w in positive.items()}
+        self.weights.update({k: -float(w) for k, w in negative.items()})
+        self.negations = tuple(negations)
+        self.negation_window = negation_window
+        self.exemptions = tuple(exemptions)
+        self._pad = max(map(len, self.exemptions), default=0) # 往前多看幾個字，例外詞跨在視窗邊界上也認得出來
+        # 長的關鍵字排前面，避免被較短的關鍵字先吃掉
+        keywords = sorted(self.weights, key=len, reverse=True)
+        self.pattern = re.compile('|'.join(map(re.escape, keywords))) if keywords else None
+        self.version = hashlib.md5(json.dumps(
+            [sorted(self.weights.items()), self.negations, negation_window, self.exemptions],
+            ensure_ascii=False).encode('utf-8')).hexdigest()[:8]
+
+    @classmethod
+    def from_file(cls, path=LEXICON_FILE):
+        with open(path, encoding='utf-8') as f:
+            lexicon = json.load(f)
+        return cls(lexicon.get('positive', {}), lexicon.get('negative', {}),
+                   lexicon.get('negations', []), lexicon.get('negation_window', 2),
+                   lexicon.get('exemptions', []))
+
+    def _negated(self, title, start):
+        before = title[max(0, start - self.negation_window - self._pad) : start]
+        for e in self.exemptions:
+            before = before.replace(e, ' ' * len(e))
+        before = before[max(0, len(before) - self.negation_window):]
+        return any(n in before for n in self.negations)
+
+    def score_headline(self, title):
+        """單則標題 -> (分數, 命中的關鍵字列表)"""
+        if self.pattern is None:
+            return 0.0, []
+        score = 0.0
+        seen = []
+        for m in self.pattern.finditer(title):
+            k = m.group()
+            if k in seen:
+                continue
+            seen.append(k)
+            weight = self.weights[k]
+            score += -weight if self._negated(title, m.start()) else weight
+        return score, seen
+
+    def score_batch(self, titles):
+        """一批標題 -> 每則的 (分數, 關鍵字) 列表"""
+        return [self.score_headline(t) for t in titles]
+
+    def score_titles(self, titles):
+        """整個新聞來源的所有標題評分，回傳 (最新標題, 總分, AI 備註)"""
+        if not titles: return "無近期新聞", 0, "消息平淡"
+
+        score = 0.0
+        found_k = []
+        for s, keywords in self.score_batch(titles):
+            score += s
+            found_k.extend(k for k in keywords if k not in found_k)
+
+        score = int(score) if float(score).is_integer() else round(score, 2)
+        remark = "消息中性"
+        if score >= 1: remark = f"🔴 偏多 ({','.join(found_k)})"
+        if score < 0: remark = f"🟢 偏空 ({','.join(found_k)})"
+        return titles[0], score, remark
+
+_default = None
+
+def default_scorer():
+    """讀取 news_lexicon.json，檔案不存在時用內建的預設關鍵字"""
+    global _default
+    if _default is None:
+        if os.path.exists(LEXICON_FILE):
+            _default = HeadlineScorer.from_file(LEXICON_FILE)
+        else:
+            _default = HeadlineScorer(dict.fromkeys(DEFAULT_POSITIVE, 1), dict.fromkeys(DEFAULT_NEGATIVE, 1))
+    return _default
@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import datetime
+import argparse
+import multiprocessing
+import pandas as pd
+import realtime_pipeline
+import metrics
+from scan_engine import ScanEngine, load_reference
+from strategies import MarketStatusStrategy
+from news_scanner import scan_news
+
+# --- 設定區 ---
+TODAY = datetime.date.today()
+SHARDS = 4                               # 預設切成幾片 (本機幾個行程)
+SHARD_DIR = os.path.join('shards', str(TODAY))  # 各分片的報表與完成紀錄 (多台機器時指到共用資料夾)
+SHARD_RPS = realtime_pipeline.MAX_RPS    # 每個分片自己的每秒請求上限
+TIMEOUT = 900                            # 超過幾秒還沒完成的分片視為落後 (straggler)
+REPORT_FILE = f'sniper_report_news_{TODAY}.csv'
+
+def parse_shard(text):
+    """'2/4' -> (2, 4)，分片從 1 開始編號"""
+    try:
+        index, count = (int(x) for x in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"分片格式應為 i/n (例如 1/4): {text}")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"分片編號超出範圍: {text}")
+    return index, count
+
+def shard_codes(codes, index, count):
+    """依代號排序後切成 count 段連續區間，回傳第 index 段 (每段檔數最多差 1)"""
+    codes = sorted(codes)
+    size, extra = divmod(len(codes), count)
+    start = (index - 1) * size + min(index - 1, extra)
+    return codes[start : start + size + (index <= extra)]
+
+def shard_paths(index, count, folder=SHARD_DIR):
+    """(分片報表, 完成紀錄)；完成紀錄最後才寫，有它才代表這個分片跑完了"""
+    base = os.path.join(folder, f"shard_{index}of{count}")
+    return base + '.csv', base + '.json'
+
+def run_shard(index, count, folder=SHARD_DIR, rps=SHARD_RPS, news=True):
+    """掃描一個分片 (可以在別台機器上跑)，報表與完成紀錄寫到 folder，回傳完成紀錄"""
+    metrics.setup(f'shard_{index}of{count}')
+    started = time.perf_counter()
+    report_path, manifest_path = shard_paths(index, count, folder)
+    os.makedirs(folder, exist_ok=True)
+    for path in (manifest_path, report_path): # 重跑時先清掉上一次的結果，失敗才不會被當成完成
+        if os.path.exists(path):
+            os.remove(path)
+
+    ref = load_reference()
+    if ref is None:
+        raise RuntimeError("找不到 stock_db.csv")
+    codes = shard_codes(ref.codes.tolist(), index, count)
+    print(f"🧩 分片 {index}/{count}: {codes[0] if codes else '-'} ~ {codes[-1] if codes else '-'} ({len(codes)} 檔)")
+
+    engine = ScanEngine(ref, async_fetch=True, max_rps=rps)
+    engine.register(MarketStatusStrategy(report_file=report_path, news_lookup=scan_news if news else None))
+    snapshot, results = engine.run(codes)
+
+    manifest = {
+        'shard': index,
+        'count': count,
+        'first': codes[0] if codes else None,
+        'last': codes[-1] if codes else None,
+        'codes': len(codes),
+        'quotes': len(snapshot),
+        'skipped': list(snapshot.skipped),
+        'rows': len(next(iter(results.values()))),
+        'seconds': round(time.perf_counter() - started, 2),
+        'finished': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    metrics.write() # Pool 的子行程不會跑 atexit，這裡自己寫
+    return manifest
+
+def merge_shards(count, folder=SHARD_DIR, report_file=REPORT_FILE):
+    """把 folder 裡 count 個分片的結果合併成一份報表 (依代號排序、重複的代號只留一筆)
+    回傳 (合併後的 DataFrame, 沒有完成紀錄的分片編號, 抓不到報價的代號)"""
+    frames, stragglers, skipped = [], [], []
+    for index in range(1, count + 1):
+        report_path, manifest_path = shard_paths(index, count, folder)
+        if not os.path.exists(manifest_path):
+            stragglers.append(index)
+            continue
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        skipped.extend(manifest['skipped'])
+        if manifest['rows']:
+            frames.append(pd.read_csv(report_path, dtype={'代號': str}))
+
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if not df.empty:
+        df = (df.drop_duplicates(subset='代號', keep='first')
+                .sort_values('代號', kind='stable')
+                .reset_index(drop=True))
+    # 寫報表 (並匯入訊號歷史) 沿用策略本身的流程
+    MarketStatusStrategy(report_file=report_file, news_lookup=None).write_report(df.to_dict('records'))
+    return df, stragglers, sorted(skipped)
+
+def report_stragglers(stragglers, count, errors=None):
+    """列出沒跑完的分片與它們負責的代號區間 (需要重跑的部分)"""
+    if not stragglers:
+        return
+    ref = load_reference()
+    codes = ref.codes.tolist() if ref is not None else []
+    print(f"\n⚠️ {len(stragglers)} 個分片沒有完成，報表缺少以下區間：")
+    for index in stragglers:
+        part = shard_codes(codes, index, count)
+        span = f"{part[0]} ~ {part[-1]} ({len(part)} 檔)" if part else "-"
+        reason = (errors or {}).get(index, "逾時或尚未完成")
+        print(f"   🧩 {index}/{count}: {span} — {reason}   重跑: python shard_scan.py --shard {index}/{count}")
+
+def run_local(count=SHARDS, folder=SHARD_DIR, rps=SHARD_RPS, timeout=TIMEOUT, news=True, report_file=REPORT_FILE):
+    """本機開 count 個行程各掃一片 (各自的速率上限)，全部完成或逾時後合併報表"""
+    started = time.perf_counter()
+    errors = {}
+    pool = multiprocessing.Pool(count)
+    jobs = {index: pool.apply_async(run_shard, (index, count, folder, rps, news)) for index in range(1, count + 1)}
+    deadline = time.monotonic() + timeout
+    for index, job in jobs.items():
+        try:
+            manifest = job.get(max(deadline - time.monotonic(), 0))
+            print(f"✅ 分片 {index}/{count} 完成：{manifest['quotes']}/{manifest['codes']} 檔有報價，"
+                  f"{manifest['rows']} 筆訊號 ({manifest['seconds']}s)")
+        except multiprocessing.TimeoutError:
+            pass
+        except Exception as e:
+            errors[index] = f"錯誤: {e}"
+    if not all(job.ready() for job in jobs.values()):
+        pool.terminate() # 落後的分片直接停掉，已完成的照樣合併
+    else:
+        pool.close()
+    pool.join()
+
+    df, stragglers, skipped = merge_shards(count, folder, report_file)
+    print(f"\n🧩 {count - len(stragglers)}/{count} 個分片完成，合併 {len(df)} 筆 ({time.perf_counter() - started:.1f}s)")
+    if skipped:
+        print(f"⚠️ {len(skipped)} 檔抓不到報價: {', '.join(skipped[:20])}")
+    report_stragglers(stragglers, count, errors)
+    return df, stragglers
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="分片掃描：依代號區間把全市場切成幾片，多個行程 (或多台機器) 同時掃描後合併報表")
+    parser.add_argument('-n', '--shards', type=int, default=SHARDS, help="本機切成幾片同時掃描")
+    parser.add_argument('--shard', type=parse_shard, help="只掃描其中一片 (多台機器分工，例如 2/4)")
+    parser.add_argument('--merge', type=int, metavar='N', help="不掃描，只合併 N 個分片的結果")
+    parser.add_argument('--dir', default=SHARD_DIR, help="分片結果資料夾 (多台機器時指到共用資料夾)")
+    parser.add_argument('--rps', type=float, default=SHARD_RPS, help="每個分片的每秒請求上限")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT, help="超過幾秒沒完成的分片視為落後")
+    parser.add_argument('--no-news', action='store_true', help="不查新聞")
+    args = parser.parse_args()
+
+    if args.shard:
+        run_shard(*args.shard, folder=args.dir, rps=args.rps, news=not args.no_news)
+    elif args.merge:
+        df, stragglers, skipped = merge_shards(args.merge, args.dir)
+        report_stragglers(stragglers, args.merge)
+    else:
+        run_local(args.shards, args.dir, args.rps, args.timeout, news=not args.no_news)
@@ -0,0 +1,163 @@
+import os
+import re
+import glob
+import sqlite3
+import argparse
+import threading
+import pandas as pd
+
+# --- 設定區 ---
+ARCHIVE_FILE = 'signal_archive.sqlite'
+REPORT_PATTERN = 'sniper_report*.csv'
+
+# 報表檔名 -> (策略, 日期)，策略名稱同 strategies.REGISTRY
+REPORT_NAME = re.compile(r'sniper_report(?:_(news|breakout))?_(\d{4}-\d{2}-\d{2})\.csv$')
+REPORT_SOURCES = {'news': 'market_status', 'breakout': 'breakout', None: 'low_band'}
+
+# 低檔10% 報表 (sniper_report_*.csv) 的 訊號類型 -> 新版訊號名稱
+LOW_BAND_SIGNALS = {"突破新高": "🚀 突破新高", "底部翻揚": "⚡ 底部翻揚", "低檔盤整": "💤 低檔盤整"}
+
+def parse_report_name(path):
+    """報表路徑 -> (策略, 日期字串)，不是掃描報表回傳 None"""
+    m = REPORT_NAME.search(os.path.basename(path))
+    if not m:
+        return None
+    return REPORT_SOURCES[m.group(1)], m.group(2)
+
+def read_report(path):
+    """讀取任一種掃描報表，整理成固定欄位與型別 (缺少的欄位給預設值)"""
+    # 強制將代號讀取為字串，避免後續相加出錯
+    df = pd.read_csv(path, dtype={'代號': str})
+
+    if '訊號' not in df.columns:
+        df['訊號'] = df['訊號類型'].map(LOW_BAND_SIGNALS) if '訊號類型' in df.columns else ""
+    if '距低點(%)' not in df.columns: df['距低點(%)'] = 0.0
+    if '市場' not in df.columns: df['市場'] = "上市" # 加入上櫃股之前的報表只有上市股
+    for col in ('新聞快訊', 'AI備註'):
+        if col not in df.columns: df[col] = ""
+
+    df['現價'] = pd.to_numeric(df['現價'], errors='coerce')
+    df['距低點(%)'] = pd.to_numeric(df['距低點(%)'], errors='coerce').fillna(0.0)
+    df[['訊號', '新聞快訊', 'AI備註']] = df[['訊號', '新聞快訊', 'AI備註']].fillna("").astype(str)
+    return df
+
+class SignalArchive:
+    """所有每日報表合併成一個 SQLite 資料庫，以 (日期, 代號, 策略) 為 key，
+    可以直接查「連續 N 天出現某訊號」或「某檔的訊號歷史」，不用重讀每一份 CSV"""
+
+    def __init__(self, path=ARCHIVE_FILE):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS signals (
+                date TEXT, code TEXT, source TEXT, name TEXT, price REAL, diff_percent REAL,
+                signal TEXT, news TEXT, remark TEXT,
+                PRIMARY KEY (date, code, source)) WITHOUT ROWID""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_code ON signals (code, date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_signal ON signals (source, signal, date)")
+            conn.execute("CREATE TABLE IF NOT EXISTS ingested (path TEXT PRIMARY KEY, mtime REAL, rows INTEGER)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def ingest_report(self, path, force=False):
+        """匯入一份報表 (同一天同策略的舊資料會被取代)，檔案沒變過就跳過，回傳匯入筆數"""
+        parsed = parse_report_name(path)
+        if parsed is None or not os.path.exists(path):
+            return 0
+        source, date = parsed
+        mtime = os.path.getmtime(path)
+        conn = self._conn()
+        row = conn.execute("SELECT mtime FROM ingested WHERE path = ?", (os.path.basename(path),)).fetchone()
+        if row and row[0] == mtime and not force:
+            return 0
+
+        df = read_report(path)
+        rows = [(date, code, source, name, price, diff, signal, news, remark)
+                for code, name, price, diff, signal, news, remark
+                in df[['代號', '名稱', '現價', '距低點(%)', '訊號', '新聞快訊', 'AI備註']].itertuples(index=False, name=None)]
+        with conn:
+            conn.execute("DELETE FROM signals WHERE date = ? AND source = ?", (date, source))
+            conn.executemany("INSERT OR REPLACE INTO signals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO ingested VALUES (?, ?, ?)", (os.path.basename(path), mtime, len(rows)))
+        return len(rows)
+
+    def ingest(self, paths=None, force=False):
+        """匯入所有報表 (預設目前資料夾的 sniper_report*.csv)，回傳 {檔名: 筆數} (只列有匯入的)"""
+        paths = sorted(glob.glob(REPORT_PATTERN)) if paths is None else paths
+        done = {}
+        for path in paths:
+            n = self.ingest_report(path, force)
+            if n:
+                done[os.path.basename(path)] = n
+        return done
+
+    def dates(self, source='market_status'):
+        return [d for (d,) in self._conn().execute(
+            "SELECT DISTINCT date FROM signals WHERE source = ? ORDER BY date", (source,))]
+
+    def history(self, code, source=None):
+        """某檔的訊號歷史 (新的在前)"""
+        sql = ("SELECT date AS 日期, source AS 策略, signal AS 訊號, price AS 現價, diff_percent AS '距低點(%)', "
+               "remark AS AI備註, news AS 新聞快訊 FROM signals WHERE code = ?")
+        params = [code]
+        if source:
+            sql += " AND source = ?"
+            params.append(source)
+        return pd.read_sql_query(sql + " ORDER BY date DESC, source", self._conn(), params=params)
+
+    def streak(self, signal, days=3, source='market_status', end=None):
+        """最近 days 個掃描日 (截至 end) 每天都出現 signal 的股票，
+        回傳 代號、名稱、第一天與最後一天的價格"""
+        conn = self._conn()
+        dates = [d for (d,) in conn.execute(
+            "SELECT DISTINCT date FROM signals WHERE source = ? AND date <= ? ORDER BY date DESC LIMIT ?",
+            (source, end or '9999-12-31', days))]
+        columns = ['代號', '名稱', '起始日', '起始價', '最新價', '漲跌(%)']
+        if len(dates) < days:
+            return pd.DataFrame(columns=columns)
+
+        marks = ','.join('?' * len(dates))
+        df = pd.read_sql_query(
+            f"""SELECT code, name, date, price FROM signals
+                WHERE source = ? AND signal = ? AND date IN ({marks}) AND code IN (
+                    SELECT code FROM signals WHERE source = ? AND signal = ? AND date IN ({marks})
+                    GROUP BY code HAVING COUNT(*) = ?)
+                ORDER BY code, date""",
+            conn, params=[source, signal, *dates, source, signal, *dates, len(dates)])
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+
+        g = df.groupby('code', sort=False)
+        first, last = g.first(), g.last()
+        out = pd.DataFrame({
+            '代號': first.index,
+            '名稱': last['name'].to_numpy(),
+            '起始日': first['date'].to_numpy(),
+            '起始價': first['price'].to_numpy(),
+            '最新價': last['price'].to_numpy(),
+        })
+        out['漲跌(%)'] = ((out['最新價'] / out['起始價'] - 1) * 100).round(2)
+        return out
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="訊號歷史資料庫：匯入每日報表、查詢連續訊號與個股歷史")
+    parser.add_argument('--force', action='store_true', help="全部報表重新匯入")
+    parser.add_argument('--code', help="查詢某檔的訊號歷史")
+    parser.add_argument('--streak', help="查詢連續出現此訊號的股票 (例如 '⚡ 底部翻揚')")
+    parser.add_argument('--days', type=int, default=3, help="連續幾個掃描日 (預設 3)")
+    parser.add_argument('--source', default='market_status', help="策略 (market_status / low_band / breakout)")
+    args = parser.parse_args()
+
+    archive = SignalArchive()
+    for name, n in archive.ingest(force=args.force).items():
+        print(f"📥 {name}: {n} 筆")
+    if args.code:
+        print(archive.history(args.code).to_string(index=False))
+    if args.streak:
+        print(archive.streak(args.streak, args.days, args.source).to_string(index=False))
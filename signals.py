@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# --- 訊號名稱 (原 sniper_news 的多分類) ---
+BREAKOUT = "🚀 突破新高"
+NEAR_HIGH = "🔥 即將創高"
+HIST_LOW = "🟢 歷史極低"
+REBOUND = "⚡ 底部翻揚"
+LOW_CONSOLIDATION = "💤 低檔盤整"
+STRONG_BULL = "🐂 強勢多頭"
+HIGH_PULLBACK = "📉 高檔回檔"
+RANGE = "⚖️ 區間震盪"
+
+# 分類結果的編號 -> 名稱 (回測等大量資料先用整數編號分類，最後才轉成文字)
+MARKET_STATUS_LABELS = np.array([BREAKOUT, NEAR_HIGH, HIST_LOW, REBOUND, LOW_CONSOLIDATION,
+                                 STRONG_BULL, HIGH_PULLBACK, RANGE], dtype=object)
+LOW_BAND_LABELS = np.array(["底部翻揚", "低檔盤整", "突破新高", ""], dtype=object)
+
+def market_status_index(price, low_200, high_200, ma5):
+    """classify_market_status 的整數版：回傳 (MARKET_STATUS_LABELS 的編號陣列, 距低點%, 位置)"""
+    price = np.asarray(price, dtype=float)
+    low_200 = np.asarray(low_200, dtype=float)
+    high_200 = np.asarray(high_200, dtype=float)
+    ma5 = np.asarray(ma5, dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        diff_percent = ((price - low_200) / low_200) * 100
+        # 判斷位置: (現價 - 低點) / (高點 - 低點)
+        position = (price - low_200) / (high_200 - low_200)
+
+    above_ma5 = price > ma5
+    low_zone = price <= low_200 * 1.15 # 放寬到 15%
+    high_zone = position > 0.7         # 在高檔區 (前 30% 強勢區)
+
+    # np.select 取第一個成立的條件，等同原本 if 由上往下的順序
+    index = np.select(
+        [
+            price >= high_200,                 # 1. 創高區
+            price >= high_200 * 0.95,
+            price <= low_200 * 1.05,           # 2. 低檔區
+            low_zone & above_ma5,
+            low_zone,
+            high_zone & above_ma5,             # 3. 中間趨勢區
+            high_zone,
+            position < 0.3,
+        ],
+        [0, 1, 2, 3, 4, 5, 6, 4],
+        default=7,
+    ).astype(np.int8)
+    return index, diff_percent, position
+
+def classify_market_status(price, low_200, high_200, ma5):
+    """多分類的向量化版本，一次判斷整批股票
+    回傳 (狀態陣列, 距低點%, 位置)，判斷順序與門檻和原本 sniper_news 的逐檔版完全相同"""
+    index, diff_percent, position = market_status_index(price, low_200, high_200, ma5)
+    return MARKET_STATUS_LABELS[index], diff_percent, position
+
+def low_band_index(price, low_200, high_200, ma5):
+    """classify_low_band 的整數版：回傳 (LOW_BAND_LABELS 的編號陣列, 距低點%)"""
+    price = np.asarray(price, dtype=float)
+    low_200 = np.asarray(low_200, dtype=float)
+    high_200 = np.asarray(high_200, dtype=float)
+    ma5 = np.asarray(ma5, dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        diff_percent = ((price - low_200) / low_200) * 100
+
+    in_band = price <= low_200 * 1.1
+    index = np.select(
+        [in_band & (price > ma5), in_band, price >= high_200],
+        [0, 1, 2],
+        default=3,
+    ).astype(np.int8)
+    return index, diff_percent
+
+def classify_low_band(price, low_200, high_200, ma5):
+    """sniper_fast / sniper_stable 的策略：距離低點 10% 內 (站上 MA5 算翻揚)，或創新高
+    回傳 (訊號類型陣列, 距低點%)，沒有訊號的是空字串"""
+    index, diff_percent = low_band_index(price, low_200, high_200, ma5)
+    return LOW_BAND_LABELS[index], diff_percent
+
+def classify_quotes(ref, quotes, rule=classify_market_status):
+    """quotes 為 {代號: 現價}，用 ReferenceTable 一次查出整批的參考資料並分類
+    站上 MA5 用的是含現價的盤中即時 MA5 (ReferenceTable.live_ma)，不是昨天的 ma5_ref
+    回傳 DataFrame (依 quotes 原順序，資料庫沒有的代號會被略過)"""
+    codes = list(quotes.keys())
+    rows = ref.rows(codes)
+    found = rows >= 0
+    rows = rows[found]
+    codes = np.asarray(codes, dtype=object)[found]
+    prices = np.fromiter(quotes.values(), dtype=float, count=len(found))[found]
+
+    ma5 = ref.live_ma(5, rows, prices)
+    result = rule(prices, ref.low_200[rows], ref.high_200[rows], ma5)
+    out = pd.DataFrame({
+        'code': codes,
+        'name': ref.names[rows],
+        'market': ref.markets[rows],
+        'price': prices,
+        'status': result[0],
+        'diff_percent': result[1],
+        'ma5': ma5,
+        'ma20': ref.live_ma(20, rows, prices),
+    })
+    if len(result) > 2:
+        out['position'] = result[2]
+    return out
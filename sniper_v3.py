@@ -16,15 +16,15 @@ def check_market_status():
     print(f"\n[{datetime.datetime.now().strftime('%H:%M:%S')}] 啟動 StockSniper V3...")
     
     # --- 關鍵修正：只篩選 4 位數的股票代碼 ---
-    # twstock.twse 包含上市股票與權證，我們過濾掉長度不等於 4 的
-    all_codes = twstock.twse.keys()
+    # twstock.twse / twstock.tpex 包含上市、上櫃股票與權證，我們過濾掉長度不等於 4 的
+    all_codes = list(twstock.twse.keys()) + list(twstock.tpex.keys())
     stock_codes = [c for c in all_codes if len(c) == 4]
     
     # 排序一下，確保從 1101 開始跑
     stock_codes.sort()
     
     print(f"資料庫總筆數: {len(all_codes)}")
-    print(f"篩選後股票數: {len(stock_codes)} (僅含4碼上市股票)")
+    print(f"篩選後股票數: {len(stock_codes)} (僅含4碼上市、上櫃股票)")
     
     # 測試模式：只取前 N 檔
     target_codes = stock_codes[:TEST_LIMIT]
@@ -15,7 +15,7 @@ def check_market_status():
     print(f"\n[{datetime.datetime.now().strftime('%H:%M:%S')}] 啟動 StockSniper V4 (修正資料抓取)...")
     
     # 1. 準備名單：過濾掉 4 碼以外的，且只抓 START_CODE 之後的
-    all_codes = twstock.twse.keys()
+    all_codes = list(twstock.twse.keys()) + list(twstock.tpex.keys()) # 上市 + 上櫃
     stock_codes = sorted([c for c in all_codes if len(c) == 4 and c >= START_CODE])
     
     # 取前幾檔測試
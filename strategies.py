@@ -0,0 +1,154 @@
+import datetime
+import pandas as pd
+from scan_engine import Strategy
+from reference_table import MARKET_NAMES
+from signals import classify_quotes, classify_market_status, classify_low_band, RANGE, BREAKOUT
+from news_scanner import scan_news
+from news_pool import NewsWorkerPool, NEWS_WORKERS
+
+TODAY = datetime.date.today()
+
+class LowBandStrategy(Strategy):
+    """距離 200 日低點 10% 內 (站上 MA5 算翻揚)，或突破 200 日新高
+    (原 sniper_fast / sniper_stable 的策略)"""
+    name = "低檔10%"
+
+    def __init__(self, report_file=f'sniper_report_{TODAY}.csv', print_all=False):
+        self.report_file = report_file
+        self.print_all = print_all # True: 沒有訊號的也印出來 (方便 Debug)
+
+    def evaluate(self, snapshot, ref):
+        print("=" * 70)
+        print(f"{'代號':<6} {'名稱':<8} {'現價':<8} {'距離低點':<12} {'狀態判斷'}")
+        print("=" * 70)
+
+        found_targets = []
+        classified = classify_quotes(ref, snapshot.quotes, rule=classify_low_band)
+        for row in classified.itertuples(index=False):
+            diff_percent = row.diff_percent
+            status_type = row.status # 用來分類存檔
+
+            status_msg = "Checking..."
+            if status_type == "低檔盤整":
+                status_msg = f"🟢 低檔盤整 ({diff_percent:.1f}%)"
+            elif status_type == "底部翻揚":
+                status_msg = f"🔥 底部翻揚! ({diff_percent:.1f}%)"
+            elif status_type == "突破新高":
+                status_msg = f"🚀 突破新高!"
+
+            if status_type or self.print_all:
+                print(f"{row.code:<6} {row.name:<8} {row.price:<8.1f} {diff_percent:>5.1f}%      {status_msg}")
+
+            if status_type:
+                found_targets.append({
+                    '代號': row.code,
+                    '名稱': row.name,
+                    '市場': MARKET_NAMES.get(row.market, row.market),
+                    '現價': row.price,
+                    '距低點(%)': round(diff_percent, 2),
+                    '訊號類型': status_type,
+                    '詳細': status_msg,
+                    '時間': snapshot.taken_at.strftime('%H:%M')
+                })
+        print("=" * 70)
+
+        # 依照訊號類型排序 (把 '底部翻揚' 排前面)
+        if found_targets:
+            found_targets = (pd.DataFrame(found_targets)
+                             .sort_values(by='訊號類型', ascending=False)
+                             .to_dict('records'))
+        return found_targets
+
+class MarketStatusStrategy(Strategy):
+    """市場狀態多分類 (原 sniper_news 的策略)，極端訊號順便查新聞
+    新聞在抓報價的同時由背景執行緒查詢，不會卡住報價掃描"""
+    name = "多策略分類"
+
+    def __init__(self, report_file=f'sniper_report_news_{TODAY}.csv', news_lookup=scan_news,
+                 news_workers=NEWS_WORKERS):
+        self.report_file = report_file
+        self.news_lookup = news_lookup # None: 不查新聞
+        self.news_pool = NewsWorkerPool(news_lookup, news_workers) if news_lookup else None
+
+    def wants_news(self, status_type):
+        # 只有 強勢 或 底部翻揚 才去浪費時間抓新聞
+        return "突破" in status_type or "底部" in status_type or "創高" in status_type
+
+    def _queue_news(self, classified):
+        if self.news_pool is None:
+            return
+        for row in classified.itertuples(index=False):
+            if self.wants_news(row.status):
+                self.news_pool.submit(row.name)
+
+    def on_quotes(self, quotes, ref):
+        # 每批報價一到就先分類，需要的新聞馬上排進背景佇列
+        self._queue_news(classify_quotes(ref, quotes, rule=classify_market_status))
+
+    def evaluate(self, snapshot, ref):
+        # [核心] 取得分類狀態
+        classified = classify_quotes(ref, snapshot.quotes, rule=classify_market_status)
+        # 報價抓完了，等新聞也查完再出報表
+        self._queue_news(classified)
+        news = self.news_pool.drain() if self.news_pool else {}
+
+        print("=" * 100)
+        print(f"{'代號':<6} {'名稱':<6} {'現價':<8} {'距低點':<8} {'狀態分類':<12} {'AI 備註'}")
+        print("=" * 100)
+
+        found_targets = []
+        for row in classified.itertuples(index=False):
+            status_type = row.status
+            # 只有 "區間震盪" 我們可能不想看，其他都存起來
+            if status_type == RANGE:
+                continue
+
+            news_title, ai_remark = "", "-" # 省略
+            if self.wants_news(status_type) and row.name in news:
+                news_title, _, ai_remark = news[row.name]
+
+            print(f"{row.code:<6} {row.name:<6} {row.price:<8.1f} {row.diff_percent:>6.1f}%   {status_type:<12} {ai_remark}")
+
+            found_targets.append({
+                '代號': row.code,
+                '名稱': row.name,
+                '市場': MARKET_NAMES.get(row.market, row.market),
+                '現價': row.price,
+                '距低點(%)': round(row.diff_percent, 1),
+                '訊號': status_type, # 這裡現在會有很多種狀態了
+                '新聞快訊': news_title,
+                'AI備註': ai_remark,
+                '綜合建議': status_type # 暫時用狀態當建議
+            })
+        print("=" * 100)
+        return found_targets
+
+class BreakoutStrategy(Strategy):
+    """現價站上 200 日高點 (突破新高)"""
+    name = "突破新高"
+
+    def __init__(self, report_file=f'sniper_report_breakout_{TODAY}.csv'):
+        self.report_file = report_file
+
+    def evaluate(self, snapshot, ref):
+        found_targets = []
+        classified = classify_quotes(ref, snapshot.quotes, rule=classify_market_status)
+        for row in classified[classified['status'] == BREAKOUT].itertuples(index=False):
+            print(f"🚀 {row.code:<6} {row.name:<8} {row.price:<8.1f} 距低點 {row.diff_percent:.1f}%")
+            found_targets.append({
+                '代號': row.code,
+                '名稱': row.name,
+                '市場': MARKET_NAMES.get(row.market, row.market),
+                '現價': row.price,
+                '距低點(%)': round(row.diff_percent, 1),
+                '訊號': row.status,
+                '時間': snapshot.taken_at.strftime('%H:%M')
+            })
+        return found_targets
+
+# scan_engine.py -s 可選的策略
+REGISTRY = {
+    'low_band': LowBandStrategy,
+    'market_status': MarketStatusStrategy,
+    'breakout': BreakoutStrategy,
+}
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import talib  # 安裝說明的 conda install -c conda-forge ta-lib
+except ImportError:
+    talib = None  # 沒裝 TA-Lib 時改用下面的 NumPy/pandas 版本 (算法相同)
+
+# --- 設定區 ---
+RSI_PERIOD = 14
+MACD_PERIODS = (12, 26, 9)   # 快線、慢線、訊號線
+KD_PERIOD = 9                # 台股常用 KD(9,3,3)：K = 2/3 前K + 1/3 RSV，D = 2/3 前D + 1/3 K
+BB_PERIOD, BB_STD = 20, 2.0
+VOLUME_MA = (5, 20)
+ATR_PERIOD = 14
+
+# 寫進 stock_db.csv 的欄位 (都是最後一根日 K 收盤後的值)
+COLUMNS = ['rsi14', 'macd', 'macd_signal', 'macd_hist', 'k9', 'd9',
+           'bb_upper', 'bb_mid', 'bb_lower', 'vol_ma5', 'vol_ma20', 'atr14']
+
+def _wilder(values, n):
+    """Wilder 平滑 (RSI、ATR 用)：前 n 筆取平均當起點，之後 (前值 * (n-1) + 新值) / n"""
+    if len(values) < n:
+        return np.full(len(values), np.nan)
+    seeded = np.concatenate([[values[:n].mean()], values[n:]])
+    smoothed = pd.Series(seeded).ewm(alpha=1 / n, adjust=False).mean().to_numpy()
+    return np.concatenate([np.full(n - 1, np.nan), smoothed])
+
+def _ema(values, n):
+    """EMA：前 n 筆取平均當起點 (同 TA-Lib)"""
+    if len(values) < n:
+        return np.full(len(values), np.nan)
+    seeded = np.concatenate([[values[:n].mean()], values[n:]])
+    smoothed = pd.Series(seeded).ewm(span=n, adjust=False).mean().to_numpy()
+    return np.concatenate([np.full(n - 1, np.nan), smoothed])
+
+def rsi(close, n=RSI_PERIOD):
+    if talib is not None:
+        return talib.RSI(close, n)
+    diff = np.diff(close)
+    gain = _wilder(np.maximum(diff, 0), n)
+    loss = _wilder(np.maximum(-diff, 0), n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = np.where(gain + loss > 0, 100 * gain / (gain + loss), 0.0)
+    return np.concatenate([[np.nan], np.where(np.isnan(gain), np.nan, value)])
+
+def macd(close, fast=MACD_PERIODS[0], slow=MACD_PERIODS[1], signal=MACD_PERIODS[2]):
+    """回傳 (DIF, 訊號線, 柱狀體)"""
+    if talib is not None:
+        return talib.MACD(close, fast, slow, signal)
+    dif = _ema(close, fast) - _ema(close, slow)
+    dea = np.full(len(close), np.nan)
+    if len(close) >= slow:
+        dea[slow - 1:] = _ema(dif[slow - 1:], signal)
+    return dif, dea, dif - dea
+
+def kd(high, low, close, n=KD_PERIOD):
+    """台股 KD (K、D 都從 50 起算)；TA-Lib 的 STOCH 是簡單平均版，數值不同，所以兩種環境都用這個版本"""
+    highest = pd.Series(high).rolling(n).max().to_numpy()
+    lowest = pd.Series(low).rolling(n).min().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsv = np.where(highest > lowest, (close - lowest) / (highest - lowest) * 100, 50.0)[n - 1:]
+    if len(rsv) == 0:
+        return np.full(len(close), np.nan), np.full(len(close), np.nan)
+    k = pd.Series(np.concatenate([[50.0], rsv])).ewm(alpha=1 / 3, adjust=False).mean().to_numpy()[1:]
+    d = pd.Series(np.concatenate([[50.0], k])).ewm(alpha=1 / 3, adjust=False).mean().to_numpy()[1:]
+    pad = np.full(n - 1, np.nan)
+    return np.concatenate([pad, k]), np.concatenate([pad, d])
+
+def bbands(close, n=BB_PERIOD, width=BB_STD):
+    """回傳 (上軌, 中線, 下軌)，標準差用母體標準差 (同 TA-Lib)"""
+    if talib is not None:
+        return talib.BBANDS(close, n, width, width)
+    rolling = pd.Series(close).rolling(n)
+    mid = rolling.mean().to_numpy()
+    std = rolling.std(ddof=0).to_numpy()
+    return mid + width * std, mid, mid - width * std
+
+def sma(values, n):
+    if talib is not None:
+        return talib.SMA(values, n)
+    return pd.Series(values).rolling(n).mean().to_numpy()
+
+def atr(high, low, close, n=ATR_PERIOD):
+    if talib is not None:
+        return talib.ATR(high, low, close, n)
+    prev = close[:-1]
+    tr = np.maximum(high[1:], prev) - np.minimum(low[1:], prev)
+    return np.concatenate([[np.nan], _wilder(tr, n)])
+
+def compute(bars):
+    """對整份日 K (history_store 格式) 一次算出所有指標，回傳 {欄位: 陣列}"""
+    close = np.ascontiguousarray(bars['close'], dtype=float)
+    # 缺高低價的日子 (只有收盤價) 用收盤價補，免得 NaN 一路傳下去
+    high = np.where(np.isnan(bars['high']), close, bars['high']).astype(float)
+    low = np.where(np.isnan(bars['low']), close, bars['low']).astype(float)
+    volume = np.ascontiguousarray(bars['volume'], dtype=float)
+
+    dif, dea, hist = macd(close)
+    k, d = kd(high, low, close)
+    upper, mid, lower = bbands(close)
+    return {
+        'rsi14': rsi(close),
+        'macd': dif, 'macd_signal': dea, 'macd_hist': hist,
+        'k9': k, 'd9': d,
+        'bb_upper': upper, 'bb_mid': mid, 'bb_lower': lower,
+        'vol_ma5': sma(volume, VOLUME_MA[0]), 'vol_ma20': sma(volume, VOLUME_MA[1]),
+        'atr14': atr(high, low, close),
+    }
+
+def latest(bars):
+    """最後一根日 K 的各項指標 (stock_db.csv 用)，資料不足的欄位是 NaN"""
+    if len(bars) == 0:
+        return dict.fromkeys(COLUMNS, np.nan)
+    return {col: round(float(values[-1]), 4) for col, values in compute(bars).items()}
@@ -0,0 +1,21 @@
+import os
+import sys
+import pytest
+
+# 專案是平放的腳本，測試直接 import 上一層的模組
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """每個測試在自己的暫存資料夾執行 (報價快取、狀態檔、報表都不會寫到專案裡)"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def universe():
+    """10 檔合成股票：({代號: 現價}, {代號: 名稱})"""
+    codes = [str(900000 + i) for i in range(10)]
+    quotes = {c: round(10 + i * 1.5, 2) for i, c in enumerate(codes)}
+    names = {c: f"合成{c}" for c in codes}
+    return quotes, names
@@ -0,0 +1,64 @@
+import json
+import pytest
+import data_builder
+import fetch_engine
+from build_journal import BuildJournal
+
+def test_journal_survives_restart():
+    with BuildJournal(batch_size=2) as journal:
+        journal.record('1101')
+        journal.record('1102', RuntimeError('blocked'))
+        journal.record('1103')
+    journal = BuildJournal()
+    assert journal.done_today() == {'1101', '1103'}
+    assert journal.failed_today() == ['1102']
+
+def test_journal_later_entry_wins():
+    with BuildJournal() as journal:
+        journal.record('1101', RuntimeError('blocked'))
+        journal.record('1101')
+    journal = BuildJournal()
+    assert journal.done_today() == {'1101'}
+    assert journal.failed_today() == []
+
+def test_journal_drops_old_days_and_torn_lines(tmp_path):
+    with open('build_journal.jsonl', 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'date': '2000-01-01', 'code': '1101', 'status': 'ok'}) + '\n')
+        f.write('{"date": "2000-01-0')
+    journal = BuildJournal()
+    assert journal.done_today() == set()
+    assert (tmp_path / 'build_journal.jsonl').read_text(encoding='utf-8') == ''
+
+@pytest.fixture
+def builder(monkeypatch):
+    """不連網的 build_database：universe 固定 4 檔，fetch_all 照 fail 失敗並記下每次要抓哪些股票"""
+    codes = ['1101', '1102', '1103', '1104']
+    runs = []
+
+    def fetch_all(jobs, max_rps, concurrency):
+        runs.append([code for code, start in jobs])
+        for code, start in jobs:
+            yield code, [], (fetch_engine.RequestRefused('blocked') if code in fail else None)
+
+    fail = set()
+    monkeypatch.setattr(data_builder, 'list_universe', lambda markets: codes)
+    monkeypatch.setattr(data_builder.fetch_engine, 'fetch_all', fetch_all)
+    monkeypatch.setattr(data_builder, 'export_reference_db', lambda universe: [])
+
+    def build(failing=(), **kwargs):
+        fail.clear()
+        fail.update(failing)
+        data_builder.build_database(**kwargs)
+        return runs[-1]
+    return build
+
+def test_resume_skips_codes_done_today(builder):
+    assert builder(failing={'1102', '1104'}) == ['1101', '1102', '1103', '1104']
+    assert builder(resume=True) == ['1102', '1104']
+    assert builder(resume=True) == []
+
+def test_retry_failed_only_runs_failed_codes(builder):
+    builder(failing={'1103'})
+    assert builder(retry_failed=True, failing={'1103'}) == ['1103']
+    assert builder(retry_failed=True) == ['1103']
+    assert builder(retry_failed=True) == []
@@ -0,0 +1,169 @@
+import datetime
+import pytest
+import twstock
+import bench_scan
+import fake_servers
+import fetch_engine
+import metrics
+import realtime_pipeline
+import scan_engine
+from batch_controller import AdaptiveBatchController
+from fake_servers import FaultPlan
+
+@pytest.fixture(autouse=True)
+def fake_upstream(monkeypatch):
+    """不真的睡，且測試結束後把報價 / 歷史來源的網址改回來"""
+    monkeypatch.setattr(metrics, 'sleep', metrics.record_sleep)
+    monkeypatch.setattr(scan_engine, 'COOLDOWN', 0)
+    monkeypatch.setattr(realtime_pipeline, 'BACKOFF', 0.01)
+    monkeypatch.setattr(fetch_engine, 'COOLDOWN', 0)
+    monkeypatch.setattr(realtime_pipeline, 'QUOTE_HOST', realtime_pipeline.QUOTE_HOST)
+    for name in ('SESSION_URL', 'STOCKINFO_URL'):
+        monkeypatch.setattr(twstock.realtime, name, getattr(twstock.realtime, name))
+    for fetcher in (twstock.stock.TWSEFetcher, twstock.stock.TPEXFetcher):
+        monkeypatch.setattr(fetcher, 'REPORT_URL', fetcher.REPORT_URL)
+
+def serve_quotes(quotes, names, faults=None, drop=(), broken=()):
+    """報價假伺服器：drop 的代號伺服器查無資料，broken 的代號缺 tlong (twstock 會整批失敗)"""
+    items = bench_scan.msg_array(quotes, names)
+    for code in drop:
+        del items[code]
+    for code in broken:
+        del items[code]['tlong']
+    server = fake_servers.quote_server(items, faults).start()
+    fake_servers.use_fake_servers(quote_url=server.url)
+    return server
+
+# --- scan_engine.fetch_snapshot (twstock.realtime) ---
+
+def test_fetch_snapshot_over_http(universe):
+    quotes, names = universe
+    codes = list(quotes)
+    server = serve_quotes(quotes, names, FaultPlan(error_rate=0.3, seed=0))
+    try:
+        snapshot = scan_engine.fetch_snapshot(codes, batch_size=4, sleep_range=(0, 0))
+    finally:
+        server.stop()
+    # twstock 遇到壞掉的 JSON 會自己重試，偶爾的錯誤不影響結果
+    assert snapshot.quotes == quotes
+    assert snapshot.skipped == []
+    assert server.counts['errors'] > 0
+
+def test_fetch_snapshot_recovers_from_resets(universe):
+    quotes, names = universe
+    server = serve_quotes(quotes, names, FaultPlan(reset_rate=0.3, seed=0))
+    try:
+        snapshot = scan_engine.fetch_snapshot(list(quotes), batch_size=4, sleep_range=(0, 0))
+    finally:
+        server.stop()
+    assert snapshot.quotes == quotes
+    assert snapshot.skipped == []
+    assert server.counts['resets'] > 0
+
+def test_fetch_snapshot_gives_up_when_always_throttled(universe):
+    quotes, names = universe
+    codes = list(quotes)
+    server = serve_quotes(quotes, names, FaultPlan(error_rate=1.0))
+    try:
+        snapshot = scan_engine.fetch_snapshot(codes, quote_fn=twstock.realtime.get,
+                                              controller=AdaptiveBatchController(4, 0.01, state_file=None))
+    finally:
+        server.stop()
+    assert snapshot.quotes == {}
+    assert sorted(snapshot.skipped) == codes
+
+def test_fetch_snapshot_bisects_tlong(universe):
+    quotes, names = universe
+    codes = list(quotes)
+    bad, missing = codes[3], codes[8]
+    server = serve_quotes(quotes, names, broken=[bad], drop=[missing])
+    try:
+        snapshot = scan_engine.fetch_snapshot(codes, batch_size=5, sleep_range=(0, 0))
+    finally:
+        server.stop()
+    # 壞掉的那檔拆到最後被跳過；查無資料的那檔是空回應，只是沒有報價
+    assert snapshot.quotes == {c: p for c, p in quotes.items() if c not in (bad, missing)}
+    assert snapshot.skipped == [bad]
+
+# --- realtime_pipeline.fetch_snapshot_async ---
+
+def test_fetch_snapshot_async_over_http(universe):
+    quotes, names = universe
+    codes = list(quotes)
+    server = serve_quotes(quotes, names, FaultPlan(error_rate=0.3, seed=0), drop=[codes[5]])
+    try:
+        snapshot = realtime_pipeline.fetch_snapshot_concurrent(codes, batch_size=3, max_rps=1e6)
+    finally:
+        server.stop()
+    assert snapshot.quotes == {c: p for c, p in quotes.items() if c != codes[5]}
+    assert list(snapshot.quotes) == [c for c in codes if c != codes[5]]
+    assert snapshot.skipped == []
+    assert server.counts['errors'] > 0
+
+def test_fetch_snapshot_async_skips_after_retries(universe):
+    quotes, names = universe
+    codes = list(quotes)
+    server = serve_quotes(quotes, names, FaultPlan(error_rate=1.0))
+    try:
+        snapshot = realtime_pipeline.fetch_snapshot_concurrent(codes, batch_size=3, max_rps=1e6)
+    finally:
+        server.stop()
+    assert snapshot.quotes == {}
+    assert sorted(snapshot.skipped) == codes
+
+def test_fetch_snapshot_async_bisects_tlong(universe):
+    quotes, names = universe
+    codes = list(quotes)
+    bad = codes[6]
+    server = serve_quotes(quotes, names, broken=[bad])
+    try:
+        snapshot = realtime_pipeline.fetch_snapshot_concurrent(codes, batch_size=10, max_rps=1e6,
+                                                               quote_fn=twstock.realtime.get)
+    finally:
+        server.stop()
+    assert snapshot.quotes == {c: p for c, p in quotes.items() if c != bad}
+    assert snapshot.skipped == [bad]
+
+# --- fetch_engine.fetch_all ---
+
+def month_rows(year, month, closes):
+    """STOCK_DAY 格式的日 K (日期、成交股數、成交金額、開、高、低、收、漲跌、筆數)"""
+    return [[f"{year - 1911}/{month:02d}/{day:02d}", "1,000", "10,000", f"{c:.2f}", f"{c:.2f}", f"{c:.2f}",
+             f"{c:.2f}", "0.00", "10"] for day, c in enumerate(closes, 1)]
+
+@pytest.fixture
+def history():
+    """上市 2330 與上櫃 6488 這個月與上個月的日 K，1101 沒有任何資料"""
+    today = datetime.date.today()
+    last = (today.replace(day=1) - datetime.timedelta(days=1))
+    start = (last.year, last.month)
+    rows = {
+        '2330': month_rows(last.year, last.month, [500, 505]) + month_rows(today.year, today.month, [510]),
+        '6488': month_rows(last.year, last.month, [300]) + month_rows(today.year, today.month, [290, 295]),
+    }
+    return start, rows
+
+def fetch_history_over_http(history, faults=None, concurrency=1):
+    start, rows = history
+    server = fake_servers.history_server(rows, faults).start()
+    fake_servers.use_fake_servers(history_url=server.url)
+    try:
+        results = fetch_engine.fetch_all([(code, start) for code in ('2330', '6488', '1101')],
+                                         max_rps=1000, concurrency=concurrency)
+        return {code: (error or [d.close for d in data]) for code, data, error in results}, server
+    finally:
+        server.stop()
+
+def test_fetch_all_over_http(history):
+    results, server = fetch_history_over_http(history, concurrency=4)
+    assert results == {'2330': [500, 505, 510], '6488': [300, 290, 295], '1101': []}
+
+def test_fetch_all_retries_refused_months(history):
+    results, server = fetch_history_over_http(history, FaultPlan(reset_rate=0.3, seed=0))
+    assert results == {'2330': [500, 505, 510], '6488': [300, 290, 295], '1101': []}
+    assert server.counts['resets'] > 0
+
+def test_fetch_all_reports_blocked_codes(history):
+    results, server = fetch_history_over_http(history, FaultPlan(error_rate=1.0))
+    assert set(results) == {'2330', '6488', '1101'}
+    assert all(isinstance(e, fetch_engine.RequestRefused) for e in results.values())
@@ -0,0 +1,36 @@
+import datetime
+from collections import namedtuple
+import numpy as np
+import history_store
+
+Data = namedtuple('Data', 'date capacity turnover open high low close change transaction')
+
+def bars(rows):
+    """[(日期字串, 收盤價), ...] -> 日 K 陣列"""
+    return np.array([(np.datetime64(d), c, c, c, c, 1000) for d, c in rows], dtype=history_store.BAR_DTYPE)
+
+def closes(b):
+    return [(str(d), float(c)) for d, c in zip(b['date'], b['close'])]
+
+def test_merge_bars_newer_wins_and_sorts_by_date():
+    old = bars([('2024-01-02', 10), ('2024-01-03', 11), ('2024-01-05', 12)])
+    new = bars([('2024-01-08', 14), ('2024-01-03', 11.5), ('2024-01-04', 13)])
+    merged = history_store.merge_bars(old, new)
+    assert closes(merged) == [('2024-01-02', 10), ('2024-01-03', 11.5), ('2024-01-04', 13),
+                              ('2024-01-05', 12), ('2024-01-08', 14)]
+
+def test_merge_bars_without_old_history():
+    new = bars([('2024-01-03', 11), ('2024-01-02', 10), ('2024-01-03', 12)])
+    assert closes(history_store.merge_bars(None, new)) == [('2024-01-02', 10), ('2024-01-03', 12)]
+    assert closes(history_store.merge_bars(bars([]), new)) == [('2024-01-02', 10), ('2024-01-03', 12)]
+
+def test_save_and_load_history():
+    rows = [Data(datetime.datetime(2024, 1, d), 1000, 0, 10.0, 11.0, 9.0, close, 0, 1)
+            for d, close in ((2, 10.5), (3, None), (4, 10.8))]
+    history_store.save_history('2330', history_store.bars_from_twstock(rows))
+    assert history_store.list_codes() == ['2330']
+    assert history_store.last_date('2330') == datetime.date(2024, 1, 4)
+    assert list(history_store.get_closes('2330')) == [10.5, 10.8] # 收盤價為 None 的那天被濾掉
+    assert list(history_store.get_closes('2330', 1)) == [10.8]
+    history_store.delete_history('2330')
+    assert history_store.load_history('2330') is None
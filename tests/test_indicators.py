@@ -0,0 +1,51 @@
+import numpy as np
+import history_store
+import indicators
+from indicators import IndicatorState
+
+def make_bars(closes, start='2024-01-01', skip=()):
+    """history_store 格式的日 K，skip 裡的序號那天沒有資料 (之後才補進來)"""
+    dates = np.arange(np.datetime64(start), np.datetime64(start) + len(closes), dtype='datetime64[D]')
+    rows = [(d, c, c, c, c, 1000) for i, (d, c) in enumerate(zip(dates, closes)) if i not in skip]
+    return np.array(rows, dtype=history_store.BAR_DTYPE)
+
+def summary(state):
+    return state.bars, state.last_date, state.low.value, state.high.value, {n: state.ma(n) for n in state.mas}
+
+def closes(n, seed=0):
+    return list(100 + np.random.default_rng(seed).normal(0, 5, n).cumsum())
+
+def test_advance_extends_new_days():
+    prices = closes(260)
+    state = IndicatorState.from_bars(make_bars(prices[:250]))
+    state, rebuilt = indicators.advance(state, make_bars(prices))
+    assert not rebuilt
+    assert summary(state) == summary(IndicatorState.from_bars(make_bars(prices)))
+
+def test_advance_rebuilds_when_close_is_revised():
+    prices = closes(260)
+    state = IndicatorState.from_bars(make_bars(prices[:250]))
+    # merge_and_save 重抓最近一個月，較早的一天被修正 (新資料為準)
+    revised = list(prices)
+    revised[247] += 50
+    bars = history_store.merge_bars(make_bars(prices[:250]), make_bars(revised)[240:])
+    state, rebuilt = indicators.advance(state, bars)
+    assert rebuilt
+    assert summary(state) == summary(IndicatorState.from_bars(make_bars(revised)))
+
+def test_advance_rebuilds_when_missing_day_is_backfilled():
+    prices = closes(260)
+    state = IndicatorState.from_bars(make_bars(prices[:250], skip={245}))
+    bars = history_store.merge_bars(make_bars(prices[:250], skip={245}), make_bars(prices)[240:])
+    state, rebuilt = indicators.advance(state, bars)
+    assert rebuilt
+    assert summary(state) == summary(IndicatorState.from_bars(make_bars(prices)))
+
+def test_state_round_trip_keeps_fingerprint(tmp_path):
+    prices = closes(250)
+    path = str(tmp_path / 'state.json')
+    indicators.save_states({'2330': IndicatorState.from_bars(make_bars(prices))}, path)
+    state = indicators.load_states(path)['2330']
+    state, rebuilt = indicators.advance(state, make_bars(prices + [prices[-1] + 1]))
+    assert not rebuilt
+    assert summary(state) == summary(IndicatorState.from_bars(make_bars(prices + [prices[-1] + 1])))
@@ -0,0 +1,27 @@
+import datetime
+import pytest
+import monitor
+
+def at(day, hour, minute=0):
+    """2024/01/01 是星期一"""
+    return datetime.datetime(2024, 1, day, hour, minute)
+
+@pytest.mark.parametrize('now, expected', [
+    (at(1, 8, 30), at(1, 9)),    # 週一開盤前：今天
+    (at(1, 9), at(2, 9)),        # 盤中：下一個交易日
+    (at(1, 14), at(2, 9)),       # 收盤後：明天
+    (at(5, 14), at(8, 9)),       # 週五收盤後：下週一
+    (at(6, 8), at(8, 9)),        # 週六開盤前 (原本會一直等到 09:00 才發現休市)
+    (at(7, 23, 59), at(8, 9)),
+])
+def test_next_open(now, expected):
+    assert monitor.next_open(now) == expected
+
+def test_in_market_hours():
+    assert monitor.in_market_hours(at(1, 9))
+    assert monitor.in_market_hours(at(1, 13, 30))
+    assert not monitor.in_market_hours(at(1, 13, 31))
+    assert not monitor.in_market_hours(at(6, 10))
+
+def test_log_file_per_day():
+    assert monitor.log_path(datetime.date(2024, 1, 2)) == 'monitor_log_2024-01-02.csv'
@@ -0,0 +1,78 @@
+import news_cache
+from news_cache import NewsCache
+
+def fetch_titles(titles):
+    """fetch_fn：每次都回傳 titles (不支援條件式請求)，並記下收到的 ETag"""
+    calls = []
+    def fetch_fn(query, etag, last_modified):
+        calls.append((query, etag, last_modified))
+        return titles, f'"{query}"', None
+    fetch_fn.calls = calls
+    return fetch_fn
+
+def rows(cache):
+    return cache._conn().execute("SELECT COUNT(*) FROM news").fetchone()[0]
+
+def test_evicts_while_running(monkeypatch):
+    monkeypatch.setattr(news_cache, 'EVICT_EVERY', 0)
+    cache = NewsCache('news.sqlite', max_entries=2)
+    for q in ('a', 'b', 'c', 'd'):
+        cache.lookup(q, fetch_titles(['標題']), len)
+    assert rows(cache) == 2
+
+def test_eviction_is_throttled(monkeypatch):
+    monkeypatch.setattr(news_cache, 'EVICT_EVERY', 3600)
+    cache = NewsCache('news.sqlite', max_entries=2)
+    for q in ('a', 'b', 'c', 'd'):
+        cache.lookup(q, fetch_titles(['標題']), len)
+    assert rows(cache) == 4 # 建立時剛清過，一小時內不再清
+
+def conditional(pages):
+    """支援 ETag 的 fetch_fn：pages[query] 為目前的標題，內容沒變且帶著相同 ETag 時回 304 (None)"""
+    calls = []
+    def fetch_fn(query, etag, last_modified):
+        calls.append((query, etag))
+        current = f'"{len(pages[query])}"'
+        if etag == current:
+            return None, etag, last_modified
+        return list(pages[query]), current, 'Mon, 01 Jan 2024 00:00:00 GMT'
+    fetch_fn.calls = calls
+    return fetch_fn
+
+def counting(score_fn):
+    def wrapped(titles):
+        wrapped.calls += 1
+        return score_fn(titles)
+    wrapped.calls = 0
+    return wrapped
+
+def test_fresh_entry_skips_network():
+    cache = NewsCache('news.sqlite')
+    fetch_fn, score_fn = conditional({'2330': ['a', 'b']}), counting(len)
+    assert cache.lookup('2330', fetch_fn, score_fn) == 2
+    assert cache.lookup('2330', fetch_fn, score_fn) == 2
+    assert len(fetch_fn.calls) == 1 and score_fn.calls == 1
+    assert (cache.hits, cache.fetched) == (1, 1)
+
+def test_not_modified_reuses_result():
+    cache = NewsCache('news.sqlite', ttl=0)
+    pages = {'2330': ['a', 'b']}
+    fetch_fn, score_fn = conditional(pages), counting(len)
+    cache.lookup('2330', fetch_fn, score_fn)
+    # 過期後帶 ETag 重新驗證，304 時沿用上次的評分 (不重新解析、不重新評分)
+    assert cache.lookup('2330', fetch_fn, score_fn) == 2
+    assert fetch_fn.calls == [('2330', None), ('2330', '"2"')]
+    assert score_fn.calls == 1
+    assert (cache.not_modified, cache.fetched) == (1, 1)
+    # 內容變了：200 回新標題並重新評分
+    pages['2330'].append('c')
+    assert cache.lookup('2330', fetch_fn, score_fn) == 3
+    assert score_fn.calls == 2
+
+def test_not_modified_rescores_when_scorer_changes():
+    cache = NewsCache('news.sqlite', ttl=0)
+    fetch_fn = conditional({'2330': ['a', 'bb']})
+    cache.lookup('2330', fetch_fn, len, scorer='v1')
+    result = cache.lookup('2330', fetch_fn, lambda titles: sum(map(len, titles)), scorer='v2')
+    assert result == 3
+    assert cache.not_modified == 1
@@ -0,0 +1,71 @@
+import pytest
+import bench_scan
+import metrics
+import portfolio_monitor
+from portfolio_monitor import PortfolioMonitor, NEW_HIGH, PULLBACK
+
+PATH = 'portfolio.json'
+
+def holdings():
+    return {'2330': {'cost': 500, 'highest': 600}, '2603': {'cost': 190, 'highest': 190}}
+
+def rules(alerts):
+    return [(code, rule) for code, rule, _ in alerts]
+
+def test_highest_survives_restart():
+    monitor = PortfolioMonitor(holdings(), path=PATH)
+    monitor.update({'2330': 650})
+    reloaded = portfolio_monitor.load_holdings(PATH)
+    assert reloaded['2330']['highest'] == 650
+    # 重開程式後以 650 為波段最高計算回檔：610 已經回落超過 5%
+    assert rules(PortfolioMonitor(reloaded, path=PATH).update({'2330': 610})) == [('2330', PULLBACK)]
+
+def test_alerts_fire_once_until_cleared():
+    monitor = PortfolioMonitor(holdings(), high_200={'2603': 200}, path=PATH)
+    assert rules(monitor.update({'2330': 560, '2603': 200})) == [('2330', PULLBACK), ('2603', NEW_HIGH)]
+    assert monitor.update({'2330': 550, '2603': 205}) == []
+    # 條件解除後再成立才會再通知
+    assert monitor.update({'2330': 590, '2603': 199}) == []
+    assert rules(monitor.update({'2330': 560, '2603': 201})) == [('2330', PULLBACK), ('2603', NEW_HIGH)]
+
+def test_missing_quote_keeps_state():
+    monitor = PortfolioMonitor(holdings(), path=PATH)
+    assert rules(monitor.update({'2330': 560})) == [('2330', PULLBACK)]
+    assert monitor.update({}) == []
+    assert monitor.update({'2330': 560}) == []
+
+def test_fetch_quotes_splits_on_bad_first_item(monkeypatch, universe):
+    quotes, names = universe
+    codes = list(quotes)
+    bad = codes[5]
+    fetch = bench_scan.realtime_payload(quotes, names)
+    requests = []
+
+    def get_quotes(batch):
+        """twstock 只檢查第一檔：壞掉的那檔排第一時整批 5002"""
+        requests.append(list(batch))
+        if batch[0] == bad:
+            return {'success': False, 'rtcode': '5002'}
+        return fetch([c for c in batch if c != bad])
+
+    monkeypatch.setattr(portfolio_monitor.realtime_pipeline, 'get_quotes', get_quotes)
+    assert portfolio_monitor.fetch_quotes(codes[5:] + codes[:5]) == {c: p for c, p in quotes.items() if c != bad}
+    assert requests[0] == codes[5:] + codes[:5]
+    assert [bad] in requests
+
+def test_keeps_running_after_the_close(monkeypatch):
+    """收盤後不結束：睡到下一次開盤，開盤後繼續查"""
+    portfolio_monitor.save_holdings(holdings(), PATH)
+    hours = iter([False, True])
+    waits, fetched = [], []
+
+    def stop(seconds, reason):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(portfolio_monitor, 'in_market_hours', lambda: next(hours))
+    monkeypatch.setattr(portfolio_monitor, 'wait_for_market', lambda: waits.append(1))
+    monkeypatch.setattr(portfolio_monitor, 'fetch_quotes', lambda codes: fetched.append(codes) or {})
+    monkeypatch.setattr(metrics, 'sleep', stop)
+    portfolio_monitor.run_portfolio_monitor(interval=1, path=PATH)
+    assert waits == [1]
+    assert fetched == [['2330', '2603']]
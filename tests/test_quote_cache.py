@@ -0,0 +1,75 @@
+import pytest
+import bench_scan
+import quote_cache
+from market_snapshot import parse_prices
+from quote_cache import QuoteCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可以手動往前撥的 time.time"""
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(quote_cache.time, 'time', lambda: now[0])
+    return now
+
+@pytest.fixture
+def upstream(universe):
+    """記下每次向上游查了哪些代號的 quote_fn；throttle 設成 True 時回傳 rtcode 5000"""
+    quotes, names = universe
+    fetch = bench_scan.realtime_payload(quotes, names)
+    calls = []
+    state = {'throttle': False}
+
+    def quote_fn(batch):
+        calls.append(list(batch))
+        if state['throttle']:
+            return {'success': False, 'rtcode': '5000'}
+        return fetch(batch)
+    quote_fn.calls = calls
+    quote_fn.state = state
+    return quote_fn
+
+def test_fresh_quotes_come_from_cache(universe, upstream, clock):
+    quotes, _ = universe
+    codes = list(quotes)
+    cache = QuoteCache(upstream)
+    assert parse_prices(cache(codes[:6]), codes[:6]) == {c: quotes[c] for c in codes[:6]}
+    clock[0] += quote_cache.QUOTE_TTL - 1
+    # 前 6 檔還新鮮，只有後 4 檔合成一次向上游查
+    assert parse_prices(cache(codes), codes) == quotes
+    assert upstream.calls == [codes[:6], codes[6:]]
+    assert (cache.hits, cache.misses, cache.upstream_requests) == (6, 10, 2)
+
+def test_expired_quotes_are_refetched(universe, upstream, clock):
+    codes = list(universe[0])
+    cache = QuoteCache(upstream)
+    cache(codes)
+    clock[0] += quote_cache.QUOTE_TTL + 1
+    fresh, stale = cache.split(codes)
+    assert fresh == {} and stale == codes
+
+def test_split_and_refresh(universe, upstream, clock):
+    quotes, _ = universe
+    codes = list(quotes)
+    cache = QuoteCache(upstream)
+    cache.refresh(codes[:3] + ['999999']) # 上游查無資料的代號不會寫進快取
+    fresh, stale = cache.split(codes[:3] + ['999999'])
+    assert list(fresh) == codes[:3] and stale == ['999999']
+    assert parse_prices(fresh, codes[:3]) == {c: quotes[c] for c in codes[:3]}
+
+def test_throttled_response_is_not_cached(universe, upstream, clock):
+    codes = list(universe[0])
+    cache = QuoteCache(upstream)
+    upstream.state['throttle'] = True
+    assert cache(codes) == {'success': False, 'rtcode': '5000'}
+    assert cache.split(codes)[1] == codes
+    upstream.state['throttle'] = False
+    cache(codes)
+    assert cache.split(codes)[1] == []
+
+def test_cache_is_shared_between_processes(universe, upstream, clock):
+    codes = list(universe[0])
+    QuoteCache(upstream)(codes)
+    other = QuoteCache(upstream)
+    other(codes)
+    assert len(upstream.calls) == 1
+    assert other.stats() == {'hits': 10, 'misses': 10, 'upstream_requests': 1, 'hit_rate': 0.5}
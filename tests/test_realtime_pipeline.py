@@ -0,0 +1,28 @@
+import asyncio
+import realtime_pipeline
+
+def tlong_quote_fn(quotes, names, bad):
+    """模擬 twstock：批次裡有壞掉的代號 (缺 tlong) 就整批丟 KeyError"""
+
+    def quote_fn(batch):
+        if bad in batch:
+            raise KeyError('tlong')
+        data = {'success': True}
+        data.update((c, {'success': True, 'info': {'code': c, 'name': names[c]},
+                         'realtime': {'latest_trade_price': f"{quotes[c]:.2f}"}}) for c in batch)
+        return data
+    return quote_fn
+
+def run_async(codes, timeout=10, **kwargs):
+    return asyncio.run(asyncio.wait_for(realtime_pipeline.fetch_snapshot_async(codes, **kwargs), timeout))
+
+def test_tlong_bisection_does_not_deadlock():
+    # 41 檔一批要拆 6 層才找得到壞掉的那檔，超過 max_in_flight (4) 層
+    codes = [str(900000 + i) for i in range(41)]
+    quotes = {c: 10.0 + i for i, c in enumerate(codes)}
+    names = {c: f"合成{c}" for c in codes}
+    bad = codes[17]
+    snapshot = run_async(codes, batch_size=41, max_rps=1e6, quote_fn=tlong_quote_fn(quotes, names, bad))
+    assert snapshot.skipped == [bad]
+    assert snapshot.quotes == {c: p for c, p in quotes.items() if c != bad}
+    assert list(snapshot.quotes) == [c for c in codes if c != bad] # 維持原本代號順序
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+import reference_table
+from reference_table import ReferenceTable
+
+TODAY = '2024-01-05'
+
+def make_table():
+    return ReferenceTable(pd.DataFrame({
+        'code': ['1101', '2330', '6488', '9999'],
+        'name': ['台泥', '台積電', '環球晶', '新股'],
+        'low_200': 10.0,
+        'high_200': 100.0,
+        'ma5_ref': [1.0, 2.0, 3.0, 4.0],
+        'ma20_ref': [10.0, 20.0, 30.0, 40.0],
+        'last_update': ['2024-01-04', TODAY, '2024-01-04', '2024-01-04'],
+    }))
+
+def trailing(n):
+    """最近 n 根收盤價 1, 2, ..., n，前面不足 TRAILING_DAYS 的補 NaN"""
+    closes = np.full(reference_table.TRAILING_DAYS, np.nan)
+    closes[reference_table.TRAILING_DAYS - n:] = np.arange(1, n + 1)
+    return closes
+
+def test_live_ma_without_closes_uses_reference():
+    ref = make_table()
+    rows = ref.rows(['2330', '1101'])
+    assert list(ref.live_ma(5, rows, np.array([50.0, 60.0]))) == [2.0, 1.0]
+
+def test_live_ma_adds_intraday_price():
+    ref = make_table()
+    days = reference_table.TRAILING_DAYS
+    # 6488 不在收盤價檔裡，9999 上市才 3 天
+    ref.attach_closes(['1101', '2330', '9999'], [trailing(days), trailing(days), trailing(3)], today=TODAY)
+    rows = ref.rows(['1101', '2330', '6488', '9999'])
+    prices = np.array([50.0, 50.0, 50.0, 50.0])
+    # 1101：昨天建檔，最近 4 根 (17..20) + 現價
+    # 2330：今天收盤後建檔，最後一根就是今天，由現價取代 -> 16..19 + 現價
+    assert ref.live_ma(5, rows, prices) == pytest.approx([(17 + 18 + 19 + 20 + 50) / 5, (16 + 17 + 18 + 19 + 50) / 5,
+                                                          3.0, 4.0])
+    assert ref.live_ma(20, rows, prices) == pytest.approx([(sum(range(2, 21)) + 50) / 20,
+                                                           (sum(range(1, 20)) + 50) / 20, 30.0, 40.0])
+
+def test_from_csv_loads_saved_closes():
+    make_table().df.to_csv('stock_db.csv', index=False)
+    reference_table.save_closes(['1101'], [trailing(reference_table.TRAILING_DAYS)], 'stock_db.csv')
+    ref = ReferenceTable.from_csv('stock_db.csv')
+    assert ref.prior_sums is not None
+    assert ref.live_ma(5, ref.rows(['1101', '2330']), np.array([50.0, 50.0]))[1] == 2.0
+    assert ref.rows(['1101', 'XXXX']).tolist() == [0, -1]
@@ -0,0 +1,85 @@
+import time
+import pytest
+import bench_scan
+import metrics
+import scan_engine
+from batch_controller import AdaptiveBatchController
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    """冷卻、批次間隔都不真的睡"""
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(scan_engine, 'COOLDOWN', 0)
+
+def counting(fn):
+    calls = []
+    def quote_fn(batch):
+        calls.append(list(batch))
+        return fn(batch)
+    quote_fn.calls = calls
+    return quote_fn
+
+def test_throttled_batches_give_up_after_max_retries(universe):
+    codes = list(universe[0])
+    quote_fn = counting(lambda batch: None) # 一直被擋 (空回應)
+    controller = AdaptiveBatchController(8, 0.01, state_file=None)
+    snapshot = scan_engine.fetch_snapshot(codes, quote_fn=quote_fn, controller=controller)
+    assert snapshot.quotes == {}
+    assert sorted(snapshot.skipped) == codes
+    assert len(quote_fn.calls) < 50
+
+def test_refused_connection_gives_up_after_max_retries(universe):
+    codes = list(universe[0])
+
+    def refuse(batch):
+        raise ConnectionError("Connection refused")
+    quote_fn = counting(refuse)
+    snapshot = scan_engine.fetch_snapshot(codes, batch_size=5, quote_fn=quote_fn)
+    assert snapshot.quotes == {}
+    assert sorted(snapshot.skipped) == codes
+    # 每批 1 次 + MAX_RETRIES 次重抓
+    assert len(quote_fn.calls) == 2 * (scan_engine.MAX_RETRIES + 1)
+
+def test_bad_item_first_in_batch_is_bisected(universe):
+    quotes, names = universe
+    codes = list(quotes)
+    bad = codes[3]
+    payload = bench_scan.realtime_payload(quotes, names)
+
+    def quote_fn(batch):
+        # 同 twstock：壞掉的那檔排第一時回傳 rtcode 5002，排在後面時丟 KeyError
+        if batch[0] == bad:
+            return {'success': False, 'rtcode': '5002', 'rtmessage': 'Invalid Stock ID.'}
+        if bad in batch:
+            raise KeyError('tlong')
+        return payload(batch)
+    snapshot = scan_engine.fetch_snapshot(codes, batch_size=5, quote_fn=quote_fn)
+    assert snapshot.quotes == {c: p for c, p in quotes.items() if c != bad}
+    assert snapshot.skipped == [bad]
+
+def test_throttle_backoff_is_separate_from_batch_pause(universe, monkeypatch):
+    quotes, names = universe
+    codes = list(quotes)
+    payload = bench_scan.realtime_payload(quotes, names)
+    sleeps = []
+    monkeypatch.setattr(metrics, 'sleep', lambda seconds, reason: sleeps.append((reason, seconds)))
+    calls = []
+
+    def quote_fn(batch):
+        calls.append(batch)
+        return None if len(calls) == 1 else payload(batch) # 第一批被擋一次
+    controller = AdaptiveBatchController(5, 1.0, state_file=None)
+    snapshot = scan_engine.fetch_snapshot(codes, quote_fn=quote_fn, controller=controller, throttle_pause=3)
+    assert snapshot.quotes == quotes
+    assert [s for r, s in sleeps if r == 'throttle'] == [3]
+
+def test_each_scanner_keeps_its_own_batch_state():
+    fast = scan_engine.ScanEngine(None, batch_size=10, sleep_range=(1, 1), quote_fn=print, name='sniper_fast')
+    fast.controller.batch_size, fast.controller.delay = 30, 0.5
+    fast.controller.on_success()
+    fast.controller.save()
+
+    news = scan_engine.ScanEngine(None, batch_size=5, sleep_range=(1.5, 3), quote_fn=print, name='sniper_news')
+    assert (news.controller.batch_size, news.controller.delay) == (5, 2.25)
+    again = scan_engine.ScanEngine(None, batch_size=10, sleep_range=(1, 1), quote_fn=print, name='sniper_fast')
+    assert (again.controller.batch_size, again.controller.delay) == (30, 0.5)
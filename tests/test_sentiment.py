@@ -0,0 +1,33 @@
+import os
+import pytest
+import sentiment
+
+@pytest.fixture
+def scorer():
+    """專案裡實際使用的 news_lexicon.json"""
+    return sentiment.HeadlineScorer.from_file(os.path.join(os.path.dirname(sentiment.__file__), sentiment.LEXICON_FILE))
+
+@pytest.mark.parametrize('title, score', [
+    ("營收不斷成長", 2),       # 「不斷」不是否定
+    ("股價不斷創高", 1),
+    ("法人無不買超", 1),
+    ("未來營收可望大增", 2),    # 「未來」不是否定
+    ("獲利不僅成長三成", 2),
+])
+def test_exempt_phrases_keep_positive_score(scorer, title, score):
+    assert scorer.score_headline(title)[0] == score
+
+@pytest.mark.parametrize('title, score', [
+    ("本季未見成長", -1),
+    ("不再虧損", 1),
+    ("營收沒有成長", 0),        # 營收 +1、沒有成長 -1
+    ("不斷虧損後終於不再虧損", -1), # 同一個關鍵字只算第一次
+])
+def test_negations_still_flip_score(scorer, title, score):
+    assert scorer.score_headline(title)[0] == score
+
+def test_exemption_straddling_window_edge():
+    # 視窗只看前 1 個字 (「不」)，但往前多看才認得出是「無不」，不算否定
+    scorer = sentiment.HeadlineScorer({'成長': 1}, {}, negations=['不'], negation_window=1, exemptions=['無不'])
+    assert scorer.score_headline("無不成長")[0] == 1
+    assert scorer.score_headline("不成長")[0] == -1
@@ -0,0 +1,47 @@
+import json
+import os
+import pandas as pd
+import pytest
+import shard_scan
+
+def write_shard(index, count, rows, skipped=(), folder='shards'):
+    """假裝第 index 片跑完：rows 為 [(代號, 現價), ...]，最後才寫完成紀錄"""
+    report_path, manifest_path = shard_scan.shard_paths(index, count, folder)
+    os.makedirs(folder, exist_ok=True)
+    if rows:
+        pd.DataFrame({'代號': [c for c, _ in rows], '名稱': '', '現價': [p for _, p in rows]}).to_csv(
+            report_path, index=False, encoding='utf-8-sig')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'shard': index, 'count': count, 'rows': len(rows), 'skipped': list(skipped)}, f)
+
+@pytest.mark.parametrize('n, count', [(10, 3), (9, 3), (2, 4), (0, 2)])
+def test_shard_codes_cover_every_code_once(n, count):
+    codes = [f"{1000 + i}" for i in range(n)][::-1]
+    parts = [shard_scan.shard_codes(codes, i, count) for i in range(1, count + 1)]
+    assert sum(parts, []) == sorted(codes)
+    assert max(map(len, parts)) - min(map(len, parts)) <= 1
+
+def test_merge_dedups_and_sorts():
+    write_shard(2, 3, [('2330', 500), ('0050', 100)], skipped=['2412'])
+    write_shard(1, 3, [('1101', 40), ('2330', 501)], skipped=['1102'])
+    write_shard(3, 3, [])
+    df, stragglers, skipped = shard_scan.merge_shards(3, 'shards', 'merged.csv')
+    # 依代號排序 (0050 的前導 0 要保留)，重疊的 2330 只留編號小的分片那筆
+    assert list(df['代號']) == ['0050', '1101', '2330']
+    assert list(df['現價']) == [100, 40, 501]
+    assert stragglers == [] and skipped == ['1102', '2412']
+    assert list(pd.read_csv('merged.csv', dtype={'代號': str})['代號']) == ['0050', '1101', '2330']
+
+def test_merge_lists_stragglers():
+    write_shard(1, 4, [('1101', 40)])
+    write_shard(3, 4, [('2330', 500)])
+    # 第 4 片寫了報表但還沒寫完成紀錄 (跑到一半)，不能算進去
+    pd.DataFrame({'代號': ['9999'], '現價': [1]}).to_csv(shard_scan.shard_paths(4, 4, 'shards')[0], index=False)
+    df, stragglers, skipped = shard_scan.merge_shards(4, 'shards', 'merged.csv')
+    assert list(df['代號']) == ['1101', '2330']
+    assert stragglers == [2, 4]
+
+def test_merge_without_finished_shards():
+    df, stragglers, skipped = shard_scan.merge_shards(2, 'shards', 'merged.csv')
+    assert df.empty and stragglers == [1, 2] and skipped == []
+    assert not os.path.exists('merged.csv')
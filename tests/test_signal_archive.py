@@ -0,0 +1,57 @@
+import os
+import pandas as pd
+import signals
+from signal_archive import SignalArchive
+
+def write_report(date, rows):
+    """rows 為 [(代號, 現價, 訊號), ...]，寫成 sniper_news 的每日報表"""
+    path = f"sniper_report_news_{date}.csv"
+    pd.DataFrame({
+        '代號': [r[0] for r in rows],
+        '名稱': [f"股票{r[0]}" for r in rows],
+        '現價': [r[1] for r in rows],
+        '距低點(%)': 1.0,
+        '訊號': [r[2] for r in rows],
+        '新聞快訊': "",
+        'AI備註': "",
+    }).to_csv(path, index=False, encoding='utf-8-sig')
+    return path
+
+REBOUND, RANGE = signals.REBOUND, signals.RANGE
+
+def build_archive():
+    # 0050 開頭的代號要確認沒被當成數字讀掉前導 0
+    write_report('2024-01-02', [('0050', 10, REBOUND), ('2330', 500, RANGE), ('2317', 100, REBOUND)])
+    write_report('2024-01-03', [('0050', 11, REBOUND), ('2330', 505, REBOUND), ('2317', 101, RANGE)])
+    write_report('2024-01-04', [('0050', 12, REBOUND), ('2330', 510, REBOUND), ('2317', 102, REBOUND)])
+    write_report('2024-01-05', [('0050', 9, REBOUND), ('2330', 520, REBOUND), ('2317', 103, REBOUND)])
+    archive = SignalArchive()
+    archive.ingest()
+    return archive
+
+def test_streak_needs_every_scan_day():
+    archive = build_archive()
+    out = archive.streak(REBOUND, days=3)
+    assert list(out['代號']) == ['0050', '2330']
+    assert list(out['起始日']) == ['2024-01-03', '2024-01-03']
+    assert list(out['起始價']) == [11, 505]
+    assert list(out['最新價']) == [9, 520]
+    assert list(out['漲跌(%)']) == [round((9 / 11 - 1) * 100, 2), round((520 / 505 - 1) * 100, 2)]
+
+def test_streak_up_to_end_date():
+    archive = build_archive()
+    assert list(archive.streak(REBOUND, days=3, end='2024-01-04')['代號']) == ['0050']
+    assert list(archive.streak(REBOUND, days=4)['代號']) == ['0050']
+
+def test_streak_without_enough_scan_days():
+    archive = build_archive()
+    assert archive.streak(REBOUND, days=5).empty
+    assert archive.streak(REBOUND, days=2, source='low_band').empty
+
+def test_reingest_replaces_the_day():
+    archive = build_archive()
+    path = write_report('2024-01-05', [('2330', 520, REBOUND)])
+    os.utime(path, (0, 0)) # 確保 mtime 跟上次匯入時不同
+    assert archive.ingest() == {os.path.basename(path): 1}
+    assert archive.ingest() == {}
+    assert list(archive.streak(REBOUND, days=3)['代號']) == ['2330']
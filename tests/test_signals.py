@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+import signals
+
+def get_market_status(price, low_200, high_200, ma5):
+    """原本 sniper_news 的逐檔版，當作向量化版本的對照"""
+    if price >= high_200:
+        return "🚀 突破新高"
+    if price >= high_200 * 0.95:
+        return "🔥 即將創高"
+    if price <= low_200 * 1.05:
+        return "🟢 歷史極低"
+    if price <= low_200 * 1.15:
+        if price > ma5:
+            return "⚡ 底部翻揚"
+        else:
+            return "💤 低檔盤整"
+    position = (price - low_200) / (high_200 - low_200)
+    if position > 0.7:
+        if price > ma5:
+            return "🐂 強勢多頭"
+        else:
+            return "📉 高檔回檔"
+    if position < 0.3:
+        return "💤 低檔盤整"
+    return "⚖️ 區間震盪"
+
+def get_low_band_status(price, low_200, high_200, ma5):
+    """原本 sniper_fast / sniper_stable 的逐檔判斷"""
+    if price <= low_200 * 1.1:
+        return "底部翻揚" if price > ma5 else "低檔盤整"
+    if price >= high_200:
+        return "突破新高"
+    return ""
+
+LOW, HIGH = 100.0, 200.0
+
+# (現價, MA5)：剛好落在每個門檻上，以及門檻兩側
+BOUNDARY_CASES = [
+    (HIGH, HIGH),                    # 剛好等於 200 日高點
+    (HIGH * 0.95, HIGH),             # 剛好距高點 5%
+    (HIGH * 0.95 - 0.01, 150),
+    (LOW * 1.05, 90),                # 剛好距低點 5%
+    (LOW * 1.05 + 0.01, 90),
+    (LOW * 1.1, 90),                 # low band 的 10%
+    (LOW * 1.1, LOW * 1.1),          # 現價剛好等於 MA5 不算站上
+    (LOW * 1.15, 90),                # 剛好距低點 15%
+    (LOW * 1.15, 120),
+    (LOW * 1.15 + 0.01, 90),
+    (LOW + (HIGH - LOW) * 0.3, 90),  # 位置剛好 0.3
+    (LOW + (HIGH - LOW) * 0.3 - 0.01, 90),
+    (LOW + (HIGH - LOW) * 0.7, 150), # 位置剛好 0.7
+    (LOW + (HIGH - LOW) * 0.7 + 0.01, 150),
+    (LOW + (HIGH - LOW) * 0.7 + 0.01, 190),
+    (150, 140),
+    (LOW * 0.9, 95),                 # 跌破低點
+    (HIGH * 1.1, 150),
+]
+
+@pytest.mark.parametrize('price, ma5', BOUNDARY_CASES)
+def test_market_status_boundaries(price, ma5):
+    status, diff_percent, position = signals.classify_market_status([price], [LOW], [HIGH], [ma5])
+    assert status[0] == get_market_status(price, LOW, HIGH, ma5)
+    assert diff_percent[0] == pytest.approx((price - LOW) / LOW * 100)
+    assert position[0] == pytest.approx((price - LOW) / (HIGH - LOW))
+
+@pytest.mark.parametrize('price, ma5', BOUNDARY_CASES)
+def test_low_band_boundaries(price, ma5):
+    status, _ = signals.classify_low_band([price], [LOW], [HIGH], [ma5])
+    assert status[0] == get_low_band_status(price, LOW, HIGH, ma5)
+
+def random_quotes(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    low = rng.uniform(10, 500, n).round(2)
+    high = (low * rng.uniform(1.05, 3, n)).round(2)
+    price = (low * rng.uniform(0.9, 3.2, n)).round(2)
+    ma5 = (price * rng.uniform(0.9, 1.1, n)).round(2)
+    return price, low, high, ma5
+
+def test_market_status_matches_scalar_rules():
+    price, low, high, ma5 = random_quotes()
+    status, _, _ = signals.classify_market_status(price, low, high, ma5)
+    expected = [get_market_status(*row) for row in zip(price, low, high, ma5)]
+    assert list(status) == expected
+    index, _, _ = signals.market_status_index(price, low, high, ma5)
+    assert list(signals.MARKET_STATUS_LABELS[index]) == expected
+
+def test_low_band_matches_scalar_rules():
+    price, low, high, ma5 = random_quotes(seed=1)
+    status, _ = signals.classify_low_band(price, low, high, ma5)
+    assert list(status) == [get_low_band_status(*row) for row in zip(price, low, high, ma5)]